@@ -7,6 +7,7 @@ from django.utils.translation import gettext_lazy as _
 from . import models as admin_models
 from core.models import SiteSettings
 from store.models import (
+    ArchivedOrder,
     Category,
     Item,
     ItemVariant,
@@ -66,6 +67,7 @@ admin_site.register(Category, admin_models.CategoryAdmin)
 admin_site.register(ItemVariant, admin_models.ItemVariantAdmin)
 admin_site.register(Item, admin_models.ItemAdmin)
 admin_site.register(Order, admin_models.OrderAdmin)
+admin_site.register(ArchivedOrder, admin_models.ArchivedOrderAdmin)
 admin_site.register(Cart, admin_models.CartAdmin)
 admin_site.register(Wishlist, admin_models.WishlistAdmin)
 admin_site.register(Rating, admin_models.RatingAdmin)
@@ -13,6 +13,7 @@ from django.core.files.base import ContentFile
 
 
 from store.models import (
+    Cart,
     CartItem,
     Category,
     CustomerProfile,
@@ -266,6 +267,7 @@ class Command(BaseCommand):
                     item_variant=item_variant,
                     quantity=random.randint(1, 10),
                 )
+            order.update_totals()
         self.stdout.write(self.style.SUCCESS(f"Created {size} random orders"))
 
     def create_random_ratings(self):
@@ -284,7 +286,7 @@ class Command(BaseCommand):
     def create_random_cart(self, user, size=1):
         for item_variant in random.sample(list(ItemVariant.objects.all()), 5):
             CartItem.objects.create(
-                cart=user.cart,
+                cart=Cart.objects.for_user(user),
                 item_variant=item_variant,
                 quantity=random.randint(1, 10),
             )
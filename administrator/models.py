@@ -1,10 +1,11 @@
 from django.utils.html import format_html
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.utils.translation import gettext_lazy as _
 from django.template.loader import get_template
 
 from store.models import (
+    ArchivedOrder,
     BannerImage,
     Cart,
     CartItem,
@@ -21,6 +22,7 @@ from store.models import (
     WishlistItem,
     Rating,
 )
+from store.orders import transition_orders
 from core.models import Site
 from . import forms as admin_forms
 
@@ -127,6 +129,39 @@ class OrderAdmin(admin.ModelAdmin):
         "timestamp",
     )
 
+    readonly_fields = ("total_quantity", "total_amount")
+    actions = ("mark_delivered", "mark_cancelled")
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        form.instance.update_totals()
+
+    def transition(self, request, queryset, status):
+        updated, rejected = transition_orders(
+            queryset.values_list("pk", flat=True), status
+        )
+        self.message_user(
+            request,
+            _("%(updated)d orders marked %(status)s.")
+            % {"updated": len(updated), "status": OrderStatus(status).label},
+            messages.SUCCESS,
+        )
+        if rejected:
+            self.message_user(
+                request,
+                _("%(rejected)d orders can't be marked %(status)s.")
+                % {"rejected": len(rejected), "status": OrderStatus(status).label},
+                messages.WARNING,
+            )
+
+    @admin.action(description=_("Mark selected orders as delivered"))
+    def mark_delivered(self, request, queryset):
+        self.transition(request, queryset, OrderStatus.Delivered)
+
+    @admin.action(description=_("Mark selected orders as cancelled"))
+    def mark_cancelled(self, request, queryset):
+        self.transition(request, queryset, OrderStatus.Cancelled)
+
     @admin.display(description=_("state"))
     def state(self, order):
         color, icon = {
@@ -148,6 +183,23 @@ class OrderAdmin(admin.ModelAdmin):
         return format_html(html)
 
 
+class ArchivedOrderAdmin(OrderAdmin):
+    """Read-only view of the orders moved out by `archiveorders`"""
+
+    model = ArchivedOrder
+    inlines = ()
+    actions = None
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 class CartItemInline(admin.StackedInline):
     model = CartItem
     form = admin_forms.CartItemInlineAdminForm
@@ -1,6 +1,7 @@
 from datetime import timedelta
 
 from django.contrib.auth import get_user_model
+from django.db.models import Sum
 from django.shortcuts import render
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
@@ -57,7 +58,7 @@ def recent_orders(request, count):
         orders = orders_all.filter(
             timestamp__gte=date, timestamp__lte=date + timedelta(days=1)
         )
-        sales.append(sum(order.total_items() for order in orders))
+        sales.append(orders.aggregate(sales=Sum("total_quantity"))["sales"] or 0)
     sales = list(reversed(sales))
     return render(
         request, "admin/addons/index/charts/recent_orders.html", {"orders": sales}
@@ -0,0 +1,24 @@
+# Generated by Django 4.1.7 on 2026-10-18 23:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("authentication", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["last_login"], name="authenticat_last_lo_9e3790_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["date_joined"], name="authenticat_date_jo_0d654e_idx"
+            ),
+        ),
+    ]
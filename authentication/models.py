@@ -41,6 +41,11 @@ class User(AbstractUser):
         ordering = ("-date_joined",)
         verbose_name = _("user")
         verbose_name_plural = _("users")
+        # Active and new users on the dashboard
+        indexes = (
+            models.Index(fields=["last_login"]),
+            models.Index(fields=["date_joined"]),
+        )
 
     email = models.EmailField(
         unique=True, blank=False, null=False, verbose_name=_("Email")
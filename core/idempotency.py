@@ -0,0 +1,114 @@
+from datetime import timedelta
+from functools import wraps
+from hashlib import sha256
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+# Response headers stored with the key and sent again on replays
+REPLAYED_HEADERS = ("Location",)
+
+
+def get_fingerprint(request):
+    digest = sha256(f"{request.method} {request.path}\n".encode())
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+def get_scope(request, fingerprint):
+    if request.user and request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    # Anonymous clients can't be told apart, so keys only match identical
+    # requests; another client reusing a key never gets someone else's response
+    return f"anonymous:{fingerprint}"
+
+
+def idempotent(view):
+    """
+    Replay the stored response of requests retried with the same
+    `Idempotency-Key` header, for `IDEMPOTENCY_KEY_TIMEOUT` seconds,
+    instead of running the view again.
+
+    Requests that raise or fail with a server error aren't stored,
+    so they can be retried. Reusing a key for a different method, path or
+    body is rejected with `422 Unprocessable Entity`.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        request = next(arg for arg in args if isinstance(arg, Request))
+        key = request.headers.get("Idempotency-Key")
+        if not key:
+            return view(*args, **kwargs)
+
+        key = key[:255]
+        fingerprint = get_fingerprint(request)
+        scope = get_scope(request, fingerprint)
+        now = timezone.now()
+        IdempotencyKey.objects.filter(
+            scope=scope, key=key, expires_at__lte=now
+        ).delete()
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    scope=scope,
+                    key=key,
+                    method=request.method,
+                    path=request.path[:255],
+                    fingerprint=fingerprint,
+                    expires_at=now
+                    + timedelta(seconds=settings.IDEMPOTENCY_KEY_TIMEOUT),
+                )
+        except IntegrityError:
+            return replay(IdempotencyKey.objects.get(scope=scope, key=key), fingerprint)
+
+        try:
+            response = view(*args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+
+        if response.status_code >= status.HTTP_500_INTERNAL_SERVER_ERROR:
+            record.delete()
+        else:
+            record.status_code = response.status_code
+            record.response = getattr(response, "data", None)
+            record.headers = {
+                header: response[header]
+                for header in REPLAYED_HEADERS
+                if response.has_header(header)
+            }
+            record.save(update_fields=["status_code", "response", "headers"])
+        return response
+
+    return wrapper
+
+
+def replay(record, fingerprint):
+    if record.fingerprint != fingerprint:
+        return Response(
+            {"detail": _("Idempotency-Key was already used for another request")},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if record.status_code is None:
+        return Response(
+            {"detail": _("A request with this Idempotency-Key is in progress")},
+            status=status.HTTP_409_CONFLICT,
+        )
+    response = Response(
+        record.response, status=record.status_code, headers=record.headers
+    )
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def clear_expired_keys():
+    return IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()[0]
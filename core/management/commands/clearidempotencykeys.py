@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.idempotency import clear_expired_keys
+
+
+class Command(BaseCommand):
+    help = "Deletes expired idempotency keys"
+
+    def handle(self, *_, **__):
+        cleared = clear_expired_keys()
+        self.stdout.write(self.style.SUCCESS(f"Cleared {cleared} idempotency keys"))
@@ -0,0 +1,22 @@
+# Generated by Django 4.1.7 on 2026-10-19 00:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0003_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="idempotencykey",
+            name="fingerprint",
+            field=models.CharField(
+                default="",
+                help_text="SHA-256 of the method, path and body of the request",
+                max_length=64,
+                verbose_name="fingerprint",
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.1.7 on 2026-10-19 00:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0004_idempotencykey_fingerprint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="idempotencykey",
+            name="headers",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                help_text="The response headers that are replayed, e.g. Location",
+                verbose_name="headers",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="idempotencykey",
+            name="scope",
+            field=models.CharField(
+                help_text="The user (or anonymous) the key belongs to",
+                max_length=80,
+                verbose_name="scope",
+            ),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.contrib.sites.models import Site
 from django.utils.translation import gettext_lazy as _
@@ -13,3 +14,48 @@ class SiteSettings(Site):
         verbose_name=_("Email admin on new user"),
         help_text=_("Email admin when a new user has registered"),
     )
+
+
+class IdempotencyKey(models.Model):
+    class Meta:
+        verbose_name = _("idempotency key")
+        verbose_name_plural = _("idempotency keys")
+        constraints = (
+            models.constraints.UniqueConstraint(
+                fields=["scope", "key"], name="idempotencykey:scope_key_constraint"
+            ),
+        )
+
+    scope = models.CharField(
+        max_length=80,
+        verbose_name=_("scope"),
+        help_text=_("The user (or anonymous) the key belongs to"),
+    )
+    key = models.CharField(max_length=255, verbose_name=_("key"))
+    method = models.CharField(max_length=10, verbose_name=_("method"))
+    path = models.CharField(max_length=255, verbose_name=_("path"))
+    fingerprint = models.CharField(
+        max_length=64,
+        default="",
+        verbose_name=_("fingerprint"),
+        help_text=_("SHA-256 of the method, path and body of the request"),
+    )
+    status_code = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_("status code"),
+        help_text=_("Empty while the request is being processed"),
+    )
+    response = models.JSONField(
+        null=True, blank=True, encoder=DjangoJSONEncoder, verbose_name=_("response")
+    )
+    headers = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name=_("headers"),
+        help_text=_("The response headers that are replayed, e.g. Location"),
+    )
+    expires_at = models.DateTimeField(verbose_name=_("expires at"))
+
+    def __str__(self):
+        return f"{self.scope} {self.key}"
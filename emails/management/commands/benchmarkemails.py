@@ -0,0 +1,83 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from emails.models import OutboxMessage, OutboxStatus
+from emails.outbox import Mailer
+from emails.sink import SMTPSink
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares email throughput of a connection per message with the "
+        "pooled, batched mailer, against a local SMTP sink"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--messages", type=int, default=200, help="Messages per scenario"
+        )
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=100,
+            help="Milliseconds the sink waits before greeting a connection, "
+            "standing in for the TLS handshake with a remote server",
+        )
+        parser.add_argument(
+            "--send-batch-size",
+            type=int,
+            default=50,
+            help="Messages per SMTP batch of the pooled mailer",
+        )
+        parser.add_argument(
+            "--rate-limit",
+            type=float,
+            default=0,
+            help="Messages per second of the pooled mailer, 0 for no limit",
+        )
+
+    def handle(self, *_, **options):
+        # Unsaved messages: the benchmark doesn't touch the database
+        messages = [
+            OutboxMessage(
+                subject=f"Benchmark {i}",
+                body="",
+                html_body="<p>" + "Lorem ipsum dolor sit amet. " * 40 + "</p>",
+                from_email="shop@example.com",
+                to=[f"customer{i}@example.com"],
+            )
+            for i in range(options["messages"])
+        ]
+        scenarios = {
+            "connection_per_message": self.send_one_by_one,
+            "pooled_batched": lambda messages: Mailer(
+                batch_size=options["send_batch_size"],
+                rate_limit=options["rate_limit"],
+            ).send(messages),
+        }
+
+        self.stdout.write(
+            f"{'scenario':<26}{'sent':>8}{'connections':>13}"
+            f"{'seconds':>10}{'msg/s':>10}"
+        )
+        for name, send in scenarios.items():
+            for message in messages:
+                message.status, message.attempts = OutboxStatus.Queued, 0
+            with SMTPSink(latency=options["latency"] / 1000) as sink:
+                with override_settings(**sink.settings()):
+                    start = time.perf_counter()
+                    send(messages)
+                    elapsed = time.perf_counter() - start
+            sent = sum(message.status == OutboxStatus.Sent for message in messages)
+            self.stdout.write(
+                f"{name:<26}{sent:>8}{sink.connections:>13}"
+                f"{elapsed:>10.2f}{sent / elapsed:>10.1f}"
+            )
+
+    def send_one_by_one(self, messages):
+        # How the signals used to send: `send_mail` opens a connection each time
+        for message in messages:
+            message.to_message().send()
+            message.mark_sent()
@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from emails.models import OutboxStatus
+from emails.notifications import send_order_digests
+from emails.outbox import Mailer, deliver_outbox
+
+
+class Command(BaseCommand):
+    help = "Sends the emails queued in the outbox, and the order digests due"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=100, help="Messages claimed at a time"
+        )
+        parser.add_argument(
+            "--send-batch-size",
+            type=int,
+            help="Messages per SMTP batch (default: EMAIL_SEND_BATCH_SIZE)",
+        )
+        parser.add_argument(
+            "--rate-limit",
+            type=float,
+            help="Messages per second, 0 for no limit "
+            "(default: EMAIL_SEND_RATE_LIMIT)",
+        )
+        parser.add_argument(
+            "--loop", action="store_true", help="Keep polling the outbox"
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait when nothing is due (with --loop)",
+        )
+
+    def handle(self, *_, **options):
+        # The connection is kept open while there is mail to send
+        with Mailer(
+            batch_size=options["send_batch_size"], rate_limit=options["rate_limit"]
+        ) as mailer:
+            while True:
+                send_order_digests()
+                messages = deliver_outbox(
+                    batch_size=options["batch_size"], mailer=mailer
+                )
+                if messages:
+                    sent = sum(
+                        message.status == OutboxStatus.Sent for message in messages
+                    )
+                    self.stdout.write(
+                        self.style.SUCCESS(
+                            f"Sent {sent} emails, {len(messages) - sent} failed"
+                        )
+                    )
+                elif not options["loop"]:
+                    return
+                else:
+                    mailer.close()
+                    time.sleep(options["interval"])
@@ -0,0 +1,86 @@
+# Generated by Django 4.1.7 on 2026-10-19 00:01
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboxMessage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("subject", models.CharField(max_length=255, verbose_name="subject")),
+                ("body", models.TextField(blank=True, verbose_name="body")),
+                ("html_body", models.TextField(blank=True, verbose_name="HTML body")),
+                (
+                    "from_email",
+                    models.CharField(
+                        blank=True, max_length=254, verbose_name="from email"
+                    ),
+                ),
+                (
+                    "to",
+                    models.JSONField(
+                        help_text="Recipient addresses", verbose_name="to"
+                    ),
+                ),
+                (
+                    "status",
+                    models.SmallIntegerField(
+                        choices=[(0, "Queued"), (1, "Sent"), (2, "Failed")],
+                        default=0,
+                        verbose_name="status",
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveSmallIntegerField(
+                        default=0, verbose_name="attempts"
+                    ),
+                ),
+                (
+                    "next_attempt_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        verbose_name="next attempt at",
+                    ),
+                ),
+                ("last_error", models.TextField(blank=True, verbose_name="last error")),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="created at"
+                    ),
+                ),
+                (
+                    "sent_at",
+                    models.DateTimeField(blank=True, null=True, verbose_name="sent at"),
+                ),
+            ],
+            options={
+                "verbose_name": "Outbox message",
+                "verbose_name_plural": "Outbox messages",
+                "ordering": ("-id",),
+            },
+        ),
+        migrations.AddIndex(
+            model_name="outboxmessage",
+            index=models.Index(
+                fields=["status", "next_attempt_at"],
+                name="emails_outb_status_a31ca0_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.1.7 on 2026-10-19 00:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0009_archived_orders"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("emails", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderNotification",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="created at"
+                    ),
+                ),
+                (
+                    "order",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="notifications",
+                        to="store.order",
+                        verbose_name="order",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="order_notifications",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="user",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Order notification",
+                "verbose_name_plural": "Order notifications",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="ordernotification",
+            index=models.Index(
+                fields=["created_at"], name="emails_orde_created_097571_idx"
+            ),
+        ),
+    ]
@@ -1,3 +1,145 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
 from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class OutboxStatus(models.IntegerChoices):
+    Queued = 0, _("Queued")
+    Sent = 1, _("Sent")
+    Failed = 2, _("Failed")
+
+
+class OutboxMessageQuerySet(models.QuerySet):
+    def due(self, now=None):
+        """Queued messages whose next attempt is not in the future"""
+        return self.filter(
+            status=OutboxStatus.Queued, next_attempt_at__lte=now or timezone.now()
+        )
+
+
+class OutboxMessage(models.Model):
+    """
+    Email waiting to be sent by `sendemails`.
+
+    Rows are written in the transaction of whatever triggered the email, so
+    rolled back changes don't send anything and SMTP never runs during a
+    request.
+    """
+
+    objects = OutboxMessageQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _("Outbox message")
+        verbose_name_plural = _("Outbox messages")
+        ordering = ("-id",)
+        indexes = (models.Index(fields=["status", "next_attempt_at"]),)
+
+    subject = models.CharField(max_length=255, verbose_name=_("subject"))
+    body = models.TextField(blank=True, verbose_name=_("body"))
+    html_body = models.TextField(blank=True, verbose_name=_("HTML body"))
+    from_email = models.CharField(
+        max_length=254, blank=True, verbose_name=_("from email")
+    )
+    to = models.JSONField(verbose_name=_("to"), help_text=_("Recipient addresses"))
+    status = models.SmallIntegerField(
+        choices=OutboxStatus.choices,
+        default=OutboxStatus.Queued,
+        verbose_name=_("status"),
+    )
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name=_("attempts"))
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now, verbose_name=_("next attempt at")
+    )
+    last_error = models.TextField(blank=True, verbose_name=_("last error"))
+    created_at = models.DateTimeField(
+        default=timezone.now, verbose_name=_("created at")
+    )
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name=_("sent at"))
+
+    @classmethod
+    def from_message(cls, message):
+        """Build an (unsaved) outbox row from an `EmailMessage`"""
+        html_body = next(
+            (
+                content
+                for content, mimetype in getattr(message, "alternatives", ())
+                if mimetype == "text/html"
+            ),
+            "",
+        )
+        return cls(
+            subject=message.subject,
+            body=message.body or "",
+            html_body=html_body,
+            from_email=message.from_email or "",
+            to=list(message.to),
+        )
+
+    def to_message(self, connection=None):
+        message = EmailMultiAlternatives(
+            self.subject,
+            self.body,
+            self.from_email or None,
+            self.to,
+            connection=connection,
+        )
+        if self.html_body:
+            message.attach_alternative(self.html_body, "text/html")
+        return message
+
+    def mark_sent(self, now=None):
+        self.status = OutboxStatus.Sent
+        self.attempts += 1
+        self.sent_at = now or timezone.now()
+        self.last_error = ""
+
+    def mark_failed(self, error, now=None):
+        """
+        Schedule another attempt after `EMAIL_OUTBOX_RETRY_DELAY` seconds,
+        doubled on every failure, or give up after `EMAIL_OUTBOX_MAX_ATTEMPTS`.
+        """
+        self.attempts += 1
+        self.last_error = str(error)
+        if self.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            self.status = OutboxStatus.Failed
+        else:
+            delay = settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (self.attempts - 1)
+            self.next_attempt_at = (now or timezone.now()) + timedelta(seconds=delay)
+
+    def __str__(self):
+        return f"{self.subject} ({', '.join(self.to)})"
+
+
+class OrderNotification(models.Model):
+    """
+    Status change of an order waiting to be emailed. `sendemails` coalesces
+    the changes of every user into one email, see `send_order_digests`.
+    """
+
+    class Meta:
+        verbose_name = _("Order notification")
+        verbose_name_plural = _("Order notifications")
+        indexes = (models.Index(fields=["created_at"]),)
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="order_notifications",
+        verbose_name=_("user"),
+    )
+    order = models.ForeignKey(
+        "store.Order",
+        on_delete=models.CASCADE,
+        related_name="notifications",
+        verbose_name=_("order"),
+    )
+    created_at = models.DateTimeField(
+        default=timezone.now, verbose_name=_("created at")
+    )
 
-# Create your models here.
+    def __str__(self):
+        return f"{self.user} #{self.order_id}"
@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.core.mail import EmailMultiAlternatives
+from django.db import transaction
+from django.db.models import Min
+from django.template.loader import get_template
+from django.utils import timezone
+
+from store.models import Order
+from .models import OrderNotification
+from .outbox import enqueue
+
+
+def html_message(subject, template, context, to):
+    msg = get_template(template).render(
+        {"admin_email": settings.EMAIL_HOST_USER, **context}
+    )
+    message = EmailMultiAlternatives(subject, "", settings.EMAIL_HOST_USER, to)
+    message.attach_alternative(msg, "text/html")
+    return message
+
+
+def order_changed_message(site, order):
+    return html_message(
+        "Update on your order",
+        "emails/order_changed.html",
+        {"site": site, "order": order},
+        [order.user.email],
+    )
+
+
+def orders_changed_message(site, user, orders):
+    if len(orders) == 1:
+        return order_changed_message(site, orders[0])
+    return html_message(
+        "Update on your orders",
+        "emails/orders_changed.html",
+        {"site": site, "user": user, "orders": orders},
+        [user.email],
+    )
+
+
+def notify_order_changes(orders):
+    """Queue the status change of `Order`s (or their ids) for the next digest"""
+    OrderNotification.objects.bulk_create(
+        OrderNotification(user_id=user_id, order_id=order_id)
+        for order_id, user_id in Order.objects.filter(pk__in=orders).values_list(
+            "pk", "user"
+        )
+    )
+
+
+def send_order_digests():
+    """
+    Enqueue one email per user for the order changes they were notified of,
+    once the oldest is `ORDER_NOTIFICATION_WINDOW` seconds old. Every order
+    is listed once, with its current status. Returns the number of emails.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.ORDER_NOTIFICATION_WINDOW)
+    with transaction.atomic():
+        users = (
+            OrderNotification.objects.values("user")
+            .annotate(first=Min("created_at"))
+            .filter(first__lte=cutoff)
+            .values_list("user", flat=True)
+        )
+        notifications = list(
+            OrderNotification.objects.select_for_update(skip_locked=True)
+            .filter(user__in=list(users))
+            .values_list("pk", "order")
+        )
+        if not notifications:
+            return 0
+
+        orders = {}
+        for order in Order.objects.filter(
+            pk__in={order for _pk, order in notifications}
+        ).select_related("user__customer"):
+            orders.setdefault(order.user, []).append(order)
+        site = Site.objects.get_current()
+        enqueue(
+            *(
+                orders_changed_message(site, user, user_orders)
+                for user, user_orders in orders.items()
+            )
+        )
+        OrderNotification.objects.filter(
+            pk__in=[pk for pk, _order in notifications]
+        ).delete()
+    return len(orders)
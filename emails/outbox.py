@@ -0,0 +1,151 @@
+import smtplib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+SEND_ERRORS = (smtplib.SMTPException, OSError)
+
+
+def enqueue(*messages):
+    """
+    Store `EmailMessage`s in the outbox for `sendemails`. Call inside the
+    transaction of the change the emails are about.
+    """
+    return OutboxMessage.objects.bulk_create(
+        OutboxMessage.from_message(message) for message in messages
+    )
+
+
+class Mailer:
+    """
+    Sends outbox messages over one long-lived connection, `batch_size`
+    messages per `send_messages` call and at most `rate_limit` messages per
+    second (0 for no limit). Both default to the `EMAIL_SEND_*` settings.
+
+    The connection is opened on the first send and reopened after a
+    failure. When a batch fails it is resent one message at a time to find
+    the message at fault, so delivery is at least once.
+    """
+
+    def __init__(self, batch_size=None, rate_limit=None):
+        self.batch_size = batch_size or settings.EMAIL_SEND_BATCH_SIZE
+        self.rate_limit = (
+            settings.EMAIL_SEND_RATE_LIMIT if rate_limit is None else rate_limit
+        )
+        self.connection = None
+        self.next_send = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def open(self):
+        if self.connection is None:
+            connection = get_connection()
+            connection.open()
+            self.connection = connection
+        return self.connection
+
+    def close(self):
+        if self.connection is not None:
+            connection, self.connection = self.connection, None
+            try:
+                connection.close()
+            except SEND_ERRORS:
+                pass
+
+    def throttle(self, count):
+        """Wait until `count` more messages fit in `rate_limit`"""
+        if not self.rate_limit:
+            return
+        now = time.monotonic()
+        if self.next_send > now:
+            time.sleep(self.next_send - now)
+            now = self.next_send
+        self.next_send = now + count / self.rate_limit
+
+    def send(self, messages):
+        """
+        Send `OutboxMessage`s, marking each of them sent or failed. Any error
+        (e.g. a `ValueError` for an invalid address) only fails the message it
+        came from.
+        """
+        now = timezone.now()
+        for start in range(0, len(messages), self.batch_size):
+            batch = messages[start : start + self.batch_size]
+            self.throttle(len(batch))
+            try:
+                self.send_batch(batch)
+            except Exception:
+                self.close()
+                for message in batch:
+                    try:
+                        self.send_batch([message])
+                    except Exception as e:
+                        self.close()
+                        message.mark_failed(e, now)
+                    else:
+                        message.mark_sent(now)
+            else:
+                for message in batch:
+                    message.mark_sent(now)
+
+    def send_batch(self, messages):
+        connection = self.open()
+        connection.send_messages(
+            [message.to_message(connection) for message in messages]
+        )
+
+
+def claim_outbox(batch_size=100):
+    """
+    Return the messages that are due, oldest first, and hide them from other
+    workers for `EMAIL_OUTBOX_LEASE` seconds, so they can be sent outside of
+    a transaction. Messages of a worker that dies are sent again once the
+    lease is over.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .due(now)
+            .order_by("next_attempt_at", "id")[:batch_size]
+        )
+        if messages:
+            OutboxMessage.objects.filter(
+                pk__in=[message.pk for message in messages]
+            ).update(
+                next_attempt_at=now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE)
+            )
+    return messages
+
+
+def deliver_outbox(batch_size=100, mailer=None):
+    """
+    Send up to `batch_size` due messages with `mailer` (a new `Mailer`,
+    closed afterwards, by default). Returns the messages attempted.
+
+    Failed messages are scheduled for a retry (see `OutboxMessage.mark_failed`)
+    instead of holding up the rest of the batch.
+    """
+    messages = claim_outbox(batch_size)
+    if not messages:
+        return messages
+
+    if mailer is None:
+        with Mailer() as mailer:
+            mailer.send(messages)
+    else:
+        mailer.send(messages)
+    OutboxMessage.objects.bulk_update(
+        messages, ["status", "attempts", "next_attempt_at", "last_error", "sent_at"]
+    )
+    return messages
@@ -0,0 +1,84 @@
+import socketserver
+import threading
+import time
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        sink = self.server
+        sink.count("connections")
+        # Stands in for the TCP and TLS handshakes of a remote server
+        time.sleep(sink.latency)
+        self.reply("220 localhost SMTP sink")
+        received = 0
+        while line := self.rfile.readline():
+            command = line.decode("ascii", "replace").split(" ", 1)[0].strip().upper()
+            if command in ("EHLO", "HELO"):
+                self.reply("250-localhost")
+                self.reply("250 8BITMIME")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while (line := self.rfile.readline()) not in (b".\r\n", b""):
+                    pass
+                self.reply("250 OK")
+                sink.count("messages")
+                received += 1
+                if sink.max_messages and received >= sink.max_messages:
+                    # Like a server closing connections after a quota
+                    return
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """
+    SMTP server on localhost that accepts and discards every message, for
+    benchmarks and tests. Counts the `connections` and `messages` received.
+
+    `latency` seconds are spent before greeting every connection, and
+    connections are closed after `max_messages` messages, if given.
+
+        with SMTPSink() as sink, override_settings(**sink.settings()):
+            ...
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=("127.0.0.1", 0), latency=0, max_messages=None):
+        super().__init__(address, SMTPSinkHandler)
+        self.latency = latency
+        self.max_messages = max_messages
+        self.connections = self.messages = 0
+        self._lock = threading.Lock()
+
+    def count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def settings(self):
+        """Settings that point Django's SMTP backend at the sink"""
+        host, port = self.server_address
+        return {
+            "EMAIL_BACKEND": "django.core.mail.backends.smtp.EmailBackend",
+            "EMAIL_HOST": host,
+            "EMAIL_PORT": port,
+            "EMAIL_HOST_USER": "",
+            "EMAIL_HOST_PASSWORD": "",
+            "EMAIL_USE_TLS": False,
+            "EMAIL_USE_SSL": False,
+        }
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
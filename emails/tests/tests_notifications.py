@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from emails.models import OrderNotification, OutboxMessage
+from emails.notifications import send_order_digests
+from store.models import Order, OrderStatus
+from store.orders import transition_orders
+
+
+@override_settings(ORDER_NOTIFICATION_WINDOW=60)
+class OrderDigestTest(TestCase):
+    def setUp(self):
+        self.customer = get_user_model().objects.create(email="customer@example.com")
+        self.customer1 = get_user_model().objects.create(email="customer1@example.com")
+        self.orders = [
+            Order.objects.create(user=self.customer, timestamp=timezone.now())
+            for _ in range(3)
+        ]
+        self.order1 = Order.objects.create(
+            user=self.customer1, timestamp=timezone.now()
+        )
+        OutboxMessage.objects.all().delete()
+
+    def digests(self):
+        return OutboxMessage.objects.filter(subject__startswith="Update on your order")
+
+    def test_coalesce(self):
+        order = self.orders[0]
+        order.status = OrderStatus.Delivered
+        order.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            transition_orders(
+                [order.pk for order in self.orders] + [self.order1.pk],
+                OrderStatus.Cancelled,
+            )
+        self.assertEqual(OrderNotification.objects.count(), 4)
+
+        # Nothing is sent until the window is over
+        self.assertEqual(send_order_digests(), 0)
+        OrderNotification.objects.update(
+            created_at=timezone.now() - timedelta(seconds=61)
+        )
+        self.assertEqual(send_order_digests(), 2)
+        self.assertFalse(OrderNotification.objects.exists())
+
+        digest = self.digests().get(to=[self.customer.email])
+        self.assertEqual(digest.subject, "Update on your orders")
+        for order in self.orders:
+            self.assertIn(f"#{order.pk}", digest.html_body)
+        # A single change gets the usual email
+        message = self.digests().get(to=[self.customer1.email])
+        self.assertEqual(message.subject, "Update on your order")
+        self.assertIn("Cancelled", message.html_body)
+
+    def test_window_starts_at_first_change(self):
+        OrderNotification.objects.create(
+            user=self.customer,
+            order=self.orders[0],
+            created_at=timezone.now() - timedelta(seconds=61),
+        )
+        OrderNotification.objects.create(user=self.customer, order=self.orders[1])
+        OrderNotification.objects.create(user=self.customer1, order=self.order1)
+
+        # The recent change joins the digest that is due
+        self.assertEqual(send_order_digests(), 1)
+        self.assertEqual(self.digests().get().to, [self.customer.email])
+        self.assertEqual(
+            list(OrderNotification.objects.values_list("user", flat=True)),
+            [self.customer1.pk],
+        )
@@ -0,0 +1,145 @@
+import io
+import smtplib
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail import EmailMultiAlternatives
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from emails.models import OutboxMessage, OutboxStatus
+from emails.outbox import Mailer, deliver_outbox, enqueue
+from emails.sink import SMTPSink
+
+
+class FailingBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+
+
+@override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=3, EMAIL_OUTBOX_RETRY_DELAY=60)
+class OutboxTest(TestCase):
+    def enqueue(self, to="customer@example.com"):
+        message = EmailMultiAlternatives("Subject", "", "shop@example.com", [to])
+        message.attach_alternative("<p>Hello</p>", "text/html")
+        return enqueue(message)[0]
+
+    def test_signals_enqueue(self):
+        user = get_user_model().objects.create(email="customer@example.com")
+        self.assertEqual(len(mail.outbox), 0)
+        # The welcome email and the admin notification
+        welcome = OutboxMessage.objects.get(subject__startswith="Welcome")
+        self.assertEqual(welcome.to, [user.email])
+        self.assertEqual(welcome.status, OutboxStatus.Queued)
+        self.assertIn("Thank you for your registration", welcome.html_body)
+        self.assertEqual(OutboxMessage.objects.count(), 2)
+
+        # Nothing is queued for changes that are rolled back
+        try:
+            with transaction.atomic():
+                get_user_model().objects.create(email="rollback@example.com")
+                raise RuntimeError()
+        except RuntimeError:
+            pass
+        self.assertEqual(OutboxMessage.objects.count(), 2)
+
+    def test_deliver(self):
+        message = self.enqueue()
+        self.assertEqual(deliver_outbox(), [message])
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["customer@example.com"])
+        self.assertEqual(mail.outbox[0].from_email, "shop@example.com")
+        self.assertEqual(mail.outbox[0].alternatives, [("<p>Hello</p>", "text/html")])
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxStatus.Sent)
+        self.assertEqual(message.attempts, 1)
+        self.assertIsNotNone(message.sent_at)
+        # Sent messages aren't sent again
+        self.assertEqual(deliver_outbox(), [])
+
+    def test_retry(self):
+        message = self.enqueue()
+        with self.settings(EMAIL_BACKEND=f"{__name__}.FailingBackend"):
+            deliver_outbox()
+            message.refresh_from_db()
+            self.assertEqual(message.status, OutboxStatus.Queued)
+            self.assertEqual(message.attempts, 1)
+            self.assertIn("Connection unexpectedly closed", message.last_error)
+            self.assertGreater(
+                message.next_attempt_at, timezone.now() + timedelta(seconds=50)
+            )
+            # Not due until the backoff has passed
+            self.assertEqual(deliver_outbox(), [])
+
+            OutboxMessage.objects.update(next_attempt_at=timezone.now())
+            deliver_outbox()
+            message.refresh_from_db()
+            self.assertEqual(message.attempts, 2)
+            # The delay doubles
+            self.assertGreater(
+                message.next_attempt_at, timezone.now() + timedelta(seconds=110)
+            )
+
+            OutboxMessage.objects.update(next_attempt_at=timezone.now())
+            deliver_outbox()
+            message.refresh_from_db()
+            self.assertEqual(message.status, OutboxStatus.Failed)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_invalid_message(self):
+        bad = self.enqueue("customer@example.com\nBcc: victim@example.com")
+        good = self.enqueue()
+        deliver_outbox()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["customer@example.com"])
+
+        good.refresh_from_db()
+        self.assertEqual(good.status, OutboxStatus.Sent)
+        # Retried later, instead of blocking the batch
+        bad.refresh_from_db()
+        self.assertEqual(bad.status, OutboxStatus.Queued)
+        self.assertEqual(bad.attempts, 1)
+        self.assertIn("newlines", bad.last_error)
+
+    def test_command(self):
+        self.enqueue("customer1@example.com")
+        self.enqueue("customer2@example.com")
+        call_command("sendemails", batch_size=1, stdout=io.StringIO())
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertFalse(OutboxMessage.objects.due().exists())
+
+    def test_pooled_delivery(self):
+        for i in range(5):
+            self.enqueue(f"customer{i}@example.com")
+        with SMTPSink() as sink, self.settings(**sink.settings()):
+            with Mailer(batch_size=2) as mailer:
+                deliver_outbox(batch_size=3, mailer=mailer)
+                deliver_outbox(batch_size=3, mailer=mailer)
+        self.assertEqual(sink.messages, 5)
+        # One connection for both batches
+        self.assertEqual(sink.connections, 1)
+        self.assertFalse(OutboxMessage.objects.exclude(status=OutboxStatus.Sent))
+
+    def test_reconnect(self):
+        for i in range(5):
+            self.enqueue(f"customer{i}@example.com")
+        # The server hangs up after every second message
+        with SMTPSink(max_messages=2) as sink, self.settings(**sink.settings()):
+            with Mailer(batch_size=2) as mailer:
+                deliver_outbox(mailer=mailer)
+        self.assertEqual(sink.messages, 5)
+        self.assertEqual(sink.connections, 3)
+        self.assertFalse(OutboxMessage.objects.exclude(status=OutboxStatus.Sent))
+
+    def test_rate_limit(self):
+        messages = [self.enqueue() for _ in range(3)]
+        start = time.monotonic()
+        Mailer(batch_size=1, rate_limit=20).send(messages)
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+        self.assertEqual(len(mail.outbox), 3)
@@ -54,6 +54,29 @@ class FarmerzAPIView(routers.APIRootView):
 
     ---
 
+    ## Conditional requests
+
+    The `item`, `category` and `banner` endpoints return `ETag` and
+    `Last-Modified` headers. Send them back as `If-None-Match` or
+    `If-Modified-Since` to get an empty `304 - Not Modified` response
+    when nothing has changed.
+
+    Anonymous responses from these endpoints are also cached on the server
+    (see the `X-Cache` header).
+
+    ---
+
+    ## Retries
+
+    Checkout, signup, rating and the cart/wishlist `PUT` endpoints accept an
+    `Idempotency-Key` header (any unique string, e.g. a UUID, per operation).
+    Retrying a request with the same key returns the stored response
+    (marked with `Idempotent-Replayed: true`) instead of repeating it.
+    The retry must have the same method, path and body, otherwise it is
+    rejected with `422 - Unprocessable Entity`.
+
+    ---
+
     ## Rate limits
 
     API is rate limited to unauthenticated users for now.
@@ -172,6 +172,18 @@ MEDIA_ROOT = os.getenv('MEDIA_ROOT') or MEDIA_ROOT
 
 MEDIA_URL = 'media/'
 
+# Absolute URL (with a trailing slash) media is served from, e.g. a CDN.
+# Defaults to MEDIA_URL on the requested host.
+MEDIA_BASE_URL = os.getenv('MEDIA_BASE_URL') or None
+
+# Maximum (width, height) of the WebP renditions generated for uploaded images
+IMAGE_RENDITIONS = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'full': (1600, 1600),
+}
+IMAGE_RENDITION_QUALITY = 80
+
 DATA_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024 * 15
 FILE_UPLOAD_MAX_MEMORY_SIZE = DATA_UPLOAD_MAX_MEMORY_SIZE
 
@@ -196,6 +208,24 @@ REST_FRAMEWORK = {
 
 CKEDITOR_UPLOAD_PATH = 'editor/'
 
+# Anonymous catalog responses are invalidated by version keys, this only
+# bounds how long stale entries stay in the cache
+CATALOG_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Seconds stock reserved for a checkout is held
+STOCK_RESERVATION_TIMEOUT = 10 * 60
+
+# Queue checkouts for the `processcheckouts` worker instead of placing
+# orders during the request (for peak traffic)
+CHECKOUT_ASYNC = os.getenv('CHECKOUT_ASYNC', '').lower() in ('1', 'true')
+
+# Seconds the response to a request with an Idempotency-Key header is replayed
+IDEMPOTENCY_KEY_TIMEOUT = 24 * 60 * 60
+
+# Days after which delivered and cancelled orders are moved to the archive
+# tables by `archiveorders`
+ORDER_ARCHIVE_AFTER_DAYS = 365
+
 # Email settings
 
 EMAIL_HOST = 'smtp.gmail.com'
@@ -203,3 +233,20 @@ EMAIL_PORT = 587
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 EMAIL_USE_TLS = True
+
+# Emails are queued in the outbox and sent by `sendemails`. Failed messages
+# are retried after EMAIL_OUTBOX_RETRY_DELAY seconds, doubled every attempt.
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 60
+# Seconds messages being sent are hidden from other workers
+EMAIL_OUTBOX_LEASE = 5 * 60
+
+# The worker keeps one SMTP connection open, sending EMAIL_SEND_BATCH_SIZE
+# messages per call and at most EMAIL_SEND_RATE_LIMIT messages a second
+# (0 for no limit)
+EMAIL_SEND_BATCH_SIZE = 50
+EMAIL_SEND_RATE_LIMIT = 0
+
+# Seconds order status changes are collected before a user gets one email
+# about all of them
+ORDER_NOTIFICATION_WINDOW = 5 * 60
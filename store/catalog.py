@@ -0,0 +1,236 @@
+import logging
+from hashlib import sha1
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from django.utils.translation import get_language
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import CatalogVersion
+
+logger = logging.getLogger(__name__)
+
+
+def bump_versions(*names):
+    """Mark the given catalogs as modified."""
+    now = timezone.now()
+    for name in names:
+        updated = CatalogVersion.objects.filter(name=name).update(
+            version=F("version") + 1, modified=now
+        )
+        if not updated:
+            try:
+                with transaction.atomic():
+                    CatalogVersion.objects.create(name=name, version=1, modified=now)
+            except IntegrityError:
+                CatalogVersion.objects.filter(name=name).update(
+                    version=F("version") + 1, modified=now
+                )
+
+
+def bump_versions_on_commit(*names):
+    """
+    Mark the given catalogs as modified once the current transaction commits.
+    The change is committed by then, so a failed bump is logged, not raised.
+    """
+
+    def bump():
+        try:
+            bump_versions(*names)
+        except DatabaseError:
+            logger.exception("Couldn't bump the catalog versions %s", names)
+
+    transaction.on_commit(bump)
+
+
+def get_versions(names):
+    """Return `{name: (version, modified)}` for the given catalogs."""
+    versions = {
+        catalog.name: (catalog.version, catalog.modified)
+        for catalog in CatalogVersion.objects.filter(name__in=names)
+    }
+    return {name: versions.get(name, (0, None)) for name in names}
+
+
+CACHE_STATS_KEYS = {"hits": "catalog:stats:hits", "misses": "catalog:stats:misses"}
+
+
+def _increment(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def get_cache_stats():
+    stats = cache.get_many(CACHE_STATS_KEYS.values())
+    hits, misses = (stats.get(key, 0) for key in CACHE_STATS_KEYS.values())
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / total if total else 0.0,
+    }
+
+
+def reset_cache_stats():
+    cache.delete_many(CACHE_STATS_KEYS.values())
+
+
+class CatalogViewMixin:
+    catalogs = ()
+
+    def get_catalog_versions(self):
+        if not hasattr(self, "_catalog_versions"):
+            self._catalog_versions = get_versions(self.catalogs)
+        return self._catalog_versions
+
+
+class ConditionalGetMixin(CatalogViewMixin):
+    """
+    Adds `ETag`/`Last-Modified` headers to `list` and `retrieve`, derived from
+    the versions of `catalogs`, and answers revalidation with `304 Not Modified`
+    before any queryset or serializer work is done.
+    """
+
+    def get_etag(self, request):
+        versions = self.get_catalog_versions()
+        key = ":".join(
+            [
+                *(f"{name}={versions[name][0]}" for name in self.catalogs),
+                get_language() or "",
+                request.accepted_renderer.format,
+                request.get_full_path(),
+            ]
+        )
+        return f'"{sha1(key.encode()).hexdigest()}"'
+
+    def get_last_modified(self):
+        modified = [
+            modified
+            for _version, modified in self.get_catalog_versions().values()
+            if modified
+        ]
+        return max(modified) if modified else None
+
+    def is_conditional(self, request):
+        # The browsable API embeds the current user, so it can't be shared
+        return request.method == "GET" and request.accepted_renderer.format != "api"
+
+    def is_not_modified(self, request, etag, last_modified):
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match:
+            return if_none_match.strip() == "*" or etag in parse_etags(if_none_match)
+        if_modified_since = parse_http_date_safe(
+            request.headers.get("If-Modified-Since", "")
+        )
+        return bool(
+            if_modified_since
+            and last_modified
+            and int(last_modified.timestamp()) <= if_modified_since
+        )
+
+    def set_conditional_headers(self, response, etag, last_modified):
+        response["ETag"] = etag
+        if last_modified:
+            response["Last-Modified"] = http_date(last_modified.timestamp())
+        patch_cache_control(response, no_cache=True)
+        patch_vary_headers(response, ("Accept", "Accept-Language"))
+        return response
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        if not self.is_conditional(request):
+            return handler(request, *args, **kwargs)
+
+        etag = self.get_etag(request)
+        last_modified = self.get_last_modified()
+        if self.is_not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        return self.set_conditional_headers(response, etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+
+class CachedResponseMixin(CatalogViewMixin):
+    """
+    Caches rendered `list` and `retrieve` responses for anonymous users.
+
+    Keys include the catalog versions, so any change to the catalog makes
+    the old entries unreachable; `CATALOG_CACHE_TIMEOUT` only bounds how long
+    unreachable entries occupy the cache.
+    """
+
+    def is_cacheable(self, request):
+        # The browsable API embeds the current user and the request
+        return (
+            request.method == "GET"
+            and not request.user.is_authenticated
+            and request.accepted_renderer.format != "api"
+        )
+
+    def get_cache_key(self, request):
+        versions = self.get_catalog_versions()
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        key = ":".join(
+            [
+                *(f"{name}={versions[name][0]}" for name in self.catalogs),
+                get_language() or "",
+                request.accepted_renderer.format,
+                # Payloads embed absolute URLs
+                request.scheme,
+                request.get_host(),
+                request.path,
+                query,
+            ]
+        )
+        return f"catalog:response:{sha1(key.encode()).hexdigest()}"
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if not self.is_cacheable(request):
+            return handler(request, *args, **kwargs)
+
+        key = self.get_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            _increment(CACHE_STATS_KEYS["hits"])
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response["X-Cache"] = "HIT"
+            return response
+
+        _increment(CACHE_STATS_KEYS["misses"])
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response["X-Cache"] = "MISS"
+            response.add_post_render_callback(
+                lambda rendered: cache.set(
+                    key,
+                    (rendered.content, rendered["Content-Type"]),
+                    settings.CATALOG_CACHE_TIMEOUT,
+                )
+            )
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,301 @@
+from collections import Counter
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, OuterRef, PositiveIntegerField, Q, When
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from .catalog import bump_versions_on_commit
+from .models import (
+    Cart,
+    CheckoutRequest,
+    CheckoutRequestStatus,
+    ItemVariant,
+    Order,
+    Purchase,
+    StockReservation,
+)
+
+
+class CheckoutError(Exception):
+    message = _("Checkout failed")
+
+    def __init__(self, message=None):
+        super().__init__(message or self.message)
+        self.message = message or self.message
+
+
+class EmptyCart(CheckoutError):
+    message = _("Cart is empty")
+
+
+class OutOfStock(CheckoutError):
+    message = _("Some items are out of stock")
+
+
+def decrement_stock(quantities, user=None):
+    """
+    Take `{item_variant_id: quantity}` out of stock with a single UPDATE.
+
+    Every row is only updated if it has enough stock left after the active
+    reservations of other users, so concurrent checkouts can't oversell.
+    Raises `OutOfStock` when any variant is short; call inside a transaction
+    so the partial update is rolled back.
+    """
+    held = StockReservation.objects.held(OuterRef("pk"), exclude_user=user)
+    condition = reduce(
+        or_,
+        (Q(pk=pk, stock__gte=held + quantity) for pk, quantity in quantities.items()),
+    )
+    updated = ItemVariant.objects.filter(condition).update(
+        stock=Case(
+            *(
+                When(pk=pk, then=F("stock") - quantity)
+                for pk, quantity in quantities.items()
+            ),
+            default=F("stock"),
+            output_field=PositiveIntegerField(),
+        )
+    )
+    if updated != len(quantities):
+        raise OutOfStock()
+    # A queryset update sends no `post_save`, so the item catalog (which
+    # shows the stock) is bumped here
+    bump_versions_on_commit("item")
+
+
+def _totals(lines, rates):
+    return {
+        "total_quantity": sum(quantity for _pk, quantity in lines),
+        "total_amount": sum(rates[pk] * quantity for pk, quantity in lines),
+    }
+
+
+def place_order(user, lines, timestamp=None):
+    """
+    Create the order for `(item_variant_id, quantity)` lines, taking their
+    stock. Call inside a transaction.
+    """
+    quantities = dict(lines)
+    decrement_stock(quantities, user=user)
+    rates = dict(
+        ItemVariant.objects.filter(pk__in=quantities).values_list("pk", "rate")
+    )
+    order = Order.objects.create(
+        user=user, timestamp=timestamp or timezone.now(), **_totals(lines, rates)
+    )
+    Purchase.objects.bulk_create(
+        Purchase(
+            order=order,
+            item_variant_id=item_variant_id,
+            quantity=quantity,
+            unit_rate=rates[item_variant_id],
+        )
+        for item_variant_id, quantity in lines
+    )
+    # The purchases replace the holds
+    StockReservation.objects.filter(user=user).delete()
+    return order
+
+
+def checkout(cart, user):
+    """Turn the cart into an order, atomically. Returns the `Order`."""
+    with transaction.atomic():
+        lines = list(cart.items.values_list("item_variant_id", "quantity"))
+        if not lines:
+            raise EmptyCart()
+
+        order = place_order(user, lines)
+        cart.clear()
+    return order
+
+
+def enqueue_checkout(cart, user):
+    """
+    Move the cart into a `CheckoutRequest` for `processcheckouts` to turn into
+    an order. Stock is checked, but only taken once the request is processed.
+    """
+    with transaction.atomic():
+        lines = dict(cart.items.values_list("item_variant_id", "quantity"))
+        if not lines:
+            raise EmptyCart()
+
+        available = (
+            ItemVariant.objects.filter(pk__in=lines)
+            .with_available_stock(exclude_user=user)
+            .values_list("pk", "available_stock")
+        )
+        if any(stock < lines[pk] for pk, stock in available):
+            raise OutOfStock()
+
+        request = CheckoutRequest.objects.create(user=user, lines=list(lines.items()))
+        cart.clear()
+    return request
+
+
+def process_checkout_requests(batch_size=100):
+    """
+    Turn the oldest queued checkout requests into orders. Returns the
+    processed requests.
+
+    The batch is planned in memory and its stock is taken with one UPDATE
+    covering every variant, instead of one per request. Should stock change
+    underneath the plan, the requests are placed one at a time.
+    """
+    with transaction.atomic():
+        requests = list(
+            CheckoutRequest.objects.select_for_update()
+            .filter(status=CheckoutRequestStatus.Queued)
+            .order_by("id")[:batch_size]
+        )
+        try:
+            with transaction.atomic():
+                _place_batch(requests)
+        except OutOfStock:
+            for request in requests:
+                _place_one(request)
+
+        CheckoutRequest.objects.bulk_update(requests, ["status", "order", "detail"])
+        for request in requests:
+            if request.status == CheckoutRequestStatus.Failed:
+                # Give the items back, so the customer can change the cart
+                cart = Cart.objects.for_user(request.user)
+                for item_variant_id, quantity in request.lines:
+                    cart.add_item(ItemVariant(pk=item_variant_id), quantity)
+    return requests
+
+
+def _place_batch(requests):
+    variants = {pk for request in requests for pk, _quantity in request.lines}
+    remaining, rates = {}, {}
+    for pk, available_stock, rate in (
+        ItemVariant.objects.filter(pk__in=variants)
+        .with_available_stock()
+        .values_list("pk", "available_stock", "rate")
+    ):
+        remaining[pk], rates[pk] = available_stock, rate
+    holds = Counter()
+    for user, item_variant, quantity in (
+        StockReservation.objects.active()
+        .filter(user__in={request.user_id for request in requests})
+        .values_list("user", "item_variant", "quantity")
+    ):
+        holds[user, item_variant] = quantity
+
+    accepted = []
+    for request in requests:
+        user = request.user_id
+        if all(
+            remaining.get(pk, 0) + holds[user, pk] >= quantity
+            for pk, quantity in request.lines
+        ):
+            for pk, quantity in request.lines:
+                remaining[pk] += holds.pop((user, pk), 0) - quantity
+            accepted.append(request)
+        else:
+            request.status = CheckoutRequestStatus.Failed
+            request.detail = OutOfStock.message
+    if not accepted:
+        return
+
+    StockReservation.objects.filter(
+        user__in={request.user_id for request in accepted}
+    ).delete()
+    totals = Counter()
+    for request in accepted:
+        for pk, quantity in request.lines:
+            totals[pk] += quantity
+    decrement_stock(totals)
+
+    for request in accepted:
+        request.order = Order.objects.create(
+            user_id=request.user_id,
+            timestamp=request.timestamp,
+            **_totals(request.lines, rates),
+        )
+        request.status = CheckoutRequestStatus.Completed
+    Purchase.objects.bulk_create(
+        Purchase(
+            order=request.order,
+            item_variant_id=pk,
+            quantity=quantity,
+            unit_rate=rates[pk],
+        )
+        for request in accepted
+        for pk, quantity in request.lines
+    )
+
+
+def _place_one(request):
+    try:
+        with transaction.atomic():
+            request.order = place_order(
+                request.user, request.lines, timestamp=request.timestamp
+            )
+            request.status = CheckoutRequestStatus.Completed
+            request.detail = ""
+    except OutOfStock as e:
+        request.order = None
+        request.status = CheckoutRequestStatus.Failed
+        request.detail = e.message
+
+
+def reserve(cart, user):
+    """
+    Hold the stock of every cart line for `STOCK_RESERVATION_TIMEOUT` seconds,
+    replacing the user's previous holds. Returns the expiry time.
+
+    Holds are subtracted from the stock other users can check out or reserve;
+    the variants are only locked while reserving.
+    """
+    expires_at = timezone.now() + timedelta(seconds=settings.STOCK_RESERVATION_TIMEOUT)
+    with transaction.atomic():
+        lines = dict(cart.items.values_list("item_variant_id", "quantity"))
+        if not lines:
+            raise EmptyCart()
+
+        # Locked so concurrent reservations of the same items are checked one
+        # at a time; in a fixed order, so two carts can't deadlock
+        list(
+            ItemVariant.objects.select_for_update()
+            .filter(pk__in=lines)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        StockReservation.objects.filter(user=user).delete()
+        StockReservation.objects.bulk_create(
+            StockReservation(
+                user=user,
+                item_variant_id=item_variant_id,
+                quantity=quantity,
+                expires_at=expires_at,
+            )
+            for item_variant_id, quantity in lines.items()
+        )
+        if (
+            ItemVariant.objects.filter(pk__in=lines)
+            .with_available_stock()
+            .filter(available_stock__lt=0)
+            .exists()
+        ):
+            raise OutOfStock()
+    return expires_at
+
+
+def release_expired_reservations(batch_size=1000):
+    """Delete expired holds in batches. Returns the number deleted."""
+    released = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                StockReservation.objects.expired().values_list("pk", flat=True)[
+                    :batch_size
+                ]
+            )
+            if not batch:
+                return released
+            released += StockReservation.objects.filter(pk__in=batch).delete()[0]
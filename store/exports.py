@@ -0,0 +1,66 @@
+import csv
+import heapq
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import ArchivedPurchase, Purchase
+from .utils import get_day_bounds
+
+# Columns of the order export, one row per purchase
+ORDER_EXPORT_FIELDS = {
+    "order": "order_id",
+    "timestamp": "order__timestamp",
+    "user": "order__user__email",
+    "status": "order__status",
+    "order_total_quantity": "order__total_quantity",
+    "order_total_amount": "order__total_amount",
+    "item": "item_variant__item_id",
+    "item_name": "item_variant__item__name",
+    "item_variant": "item_variant_id",
+    "color": "item_variant__color",
+    "quantity": "quantity",
+    "unit_rate": "unit_rate",
+}
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+def order_export_rows(start, end):
+    """
+    Yield the purchases of the orders placed from `start` to `end` (dates,
+    inclusive) as tuples of `ORDER_EXPORT_FIELDS`, fetched in chunks.
+
+    Archived orders are included: both tables are read in order and merged.
+    An order is in one table or the other, so its purchases stay together.
+    """
+    start, end = get_day_bounds(start, end)
+    streams = (
+        model.objects.filter(order__timestamp__gte=start, order__timestamp__lt=end)
+        .order_by("order__timestamp", "order_id", "id")
+        .values_list(*ORDER_EXPORT_FIELDS.values())
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        for model in (Purchase, ArchivedPurchase)
+    )
+    timestamp, order = (
+        list(ORDER_EXPORT_FIELDS).index(field) for field in ("timestamp", "order")
+    )
+    return heapq.merge(*streams, key=lambda row: (row[timestamp], row[order]))
+
+
+class _Echo:
+    """File-like object handing back what `csv.writer` writes"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(fields, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(fields, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder) + "\n"
@@ -0,0 +1,78 @@
+import io
+import posixpath
+
+from PIL import Image
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils.encoding import filepath_to_uri
+
+
+def generate_renditions(image):
+    """
+    Render every size in `IMAGE_RENDITIONS` from the `ImageFieldFile` as WebP.
+
+    Returns `{"source": name, rendition: {"name", "width", "height"}, ...}`
+    which is stored on the model, so URLs can be built without touching
+    the storage.
+    """
+    directory, filename = posixpath.split(image.name)
+    stem = posixpath.splitext(filename)[0]
+    renditions = {"source": image.name}
+
+    image.open("rb")
+    try:
+        source = Image.open(image)
+        source.load()
+    finally:
+        image.close()
+    if source.mode not in ("RGB", "RGBA"):
+        source = source.convert("RGBA" if "transparency" in source.info else "RGB")
+
+    for rendition, size in settings.IMAGE_RENDITIONS.items():
+        rendered = source.copy()
+        rendered.thumbnail(size, Image.LANCZOS)
+        buffer = io.BytesIO()
+        rendered.save(buffer, "WEBP", quality=settings.IMAGE_RENDITION_QUALITY)
+        name = default_storage.save(
+            posixpath.join(directory, "renditions", f"{stem}_{rendition}.webp"),
+            ContentFile(buffer.getvalue()),
+        )
+        renditions[rendition] = {
+            "name": name,
+            "width": rendered.width,
+            "height": rendered.height,
+        }
+    return renditions
+
+
+def delete_renditions(renditions):
+    for rendition in settings.IMAGE_RENDITIONS:
+        if rendition in renditions:
+            default_storage.delete(renditions[rendition]["name"])
+
+
+def get_media_base_url(request):
+    """`MEDIA_BASE_URL`, or the absolute media URL, computed once per request"""
+    if not hasattr(request, "_media_base_url"):
+        request._media_base_url = settings.MEDIA_BASE_URL or (
+            request.build_absolute_uri(default_storage.url(""))
+        )
+    return request._media_base_url
+
+
+def get_media_url(request, name):
+    return get_media_base_url(request) + filepath_to_uri(name)
+
+
+def get_rendition_urls(request, renditions):
+    return {
+        rendition: {
+            "url": get_media_url(request, renditions[rendition]["name"]),
+            "width": renditions[rendition]["width"],
+            "height": renditions[rendition]["height"],
+        }
+        for rendition in settings.IMAGE_RENDITIONS
+        if rendition in renditions
+    }
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from store.orders import archive_orders
+
+
+class Command(BaseCommand):
+    help = "Moves old delivered and cancelled orders to the archive tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.ORDER_ARCHIVE_AFTER_DAYS,
+            help="Archive orders placed more than this many days ago",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Orders per transaction"
+        )
+
+    def handle(self, *_, **options):
+        archived = archive_orders(
+            timezone.now() - timedelta(days=options["days"]),
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} orders"))
@@ -0,0 +1,113 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from store.views import ItemViewSet, OrderViewSet
+
+
+class Command(BaseCommand):
+    help = "Compares payload size, query count and latency of API endpoints"
+
+    # name: (viewset, actions, path, params, authenticated)
+    scenarios = {
+        "item_list": (ItemViewSet, {"get": "list"}, "/api/item/", {}, False),
+        "item_list_compact": (
+            ItemViewSet,
+            {"get": "list"},
+            "/api/item/",
+            {"compact": "1"},
+            False,
+        ),
+        "order_list": (OrderViewSet, {"get": "list"}, "/api/order/", {}, True),
+        "order_list_compact": (
+            OrderViewSet,
+            {"get": "list"},
+            "/api/order/",
+            {"compact": "1"},
+            True,
+        ),
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "scenarios",
+            nargs="*",
+            help="Scenarios to run (default: all). "
+            f"Available: {', '.join(self.scenarios)}",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="Requests per scenario"
+        )
+        parser.add_argument(
+            "--user",
+            help="Email of the user to authenticate as "
+            "(default: the user with the most orders)",
+        )
+
+    def handle(self, *_, **options):
+        names = options["scenarios"] or list(self.scenarios)
+        unknown = set(names) - set(self.scenarios)
+        if unknown:
+            self.stderr.write(
+                self.style.ERROR(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+            )
+            return
+
+        # Only the scenarios that authenticate need a user
+        user = None
+        if any(self.scenarios[name][-1] for name in names):
+            users = get_user_model().objects.all()
+            try:
+                if options["user"]:
+                    user = users.get(email=options["user"])
+                else:
+                    user = users.annotate(orders_count=Count("orders")).latest(
+                        "orders_count"
+                    )
+            except get_user_model().DoesNotExist:
+                self.stderr.write(self.style.ERROR("No user to authenticate as"))
+                return
+
+        self.stdout.write(
+            f"{'scenario':<24}{'bytes':>12}{'queries':>10}"
+            f"{'median ms':>12}{'p95 ms':>10}"
+        )
+        for name in names:
+            size, queries, timings = self.run_scenario(
+                *self.scenarios[name], user=user, repeat=options["repeat"]
+            )
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            self.stdout.write(
+                f"{name:<24}{size:>12}{queries:>10}"
+                f"{statistics.median(timings):>12.2f}{p95:>10.2f}"
+            )
+
+    def run_scenario(self, viewset, actions, path, params, authenticated, user, repeat):
+        factory = APIRequestFactory()
+        view = viewset.as_view(actions)
+        timings = []
+        size = queries = 0
+        for _ in range(max(repeat, 1)):
+            request = factory.get(
+                path, params, HTTP_ACCEPT="application/json", HTTP_HOST="localhost"
+            )
+            if authenticated:
+                force_authenticate(request, user)
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                response = view(request)
+                # Responses served from the catalog cache are already rendered
+                if hasattr(response, "render"):
+                    response.render()
+                timings.append((time.perf_counter() - start) * 1000)
+            size = len(response.content)
+            queries = len(context.captured_queries)
+        return size, queries, timings
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from store.models import BannerImage, Category, ItemVariantImage
+
+
+class Command(BaseCommand):
+    help = "Generates missing or outdated image renditions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force", action="store_true", help="Regenerate every rendition"
+        )
+
+    def handle(self, *_, **options):
+        for model in (Category, ItemVariantImage, BannerImage):
+            count = 0
+            for instance in model.objects.exclude(image="").iterator():
+                if options["force"]:
+                    instance.renditions.pop("source", None)
+                elif instance.renditions.get("source") == instance.image.name:
+                    continue
+                # The post_save receiver renders the image
+                instance.save(update_fields=["renditions"])
+                count += 1
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Generated renditions for {count} "
+                    f"{model._meta.verbose_name_plural}"
+                )
+            )
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.checkout import process_checkout_requests
+from store.models import CheckoutRequestStatus
+
+
+class Command(BaseCommand):
+    help = "Turns queued checkout requests into orders"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=100, help="Requests per transaction"
+        )
+        parser.add_argument(
+            "--loop", action="store_true", help="Keep polling the queue"
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait when the queue is empty (with --loop)",
+        )
+
+    def handle(self, *_, **options):
+        while True:
+            requests = process_checkout_requests(batch_size=options["batch_size"])
+            if requests:
+                completed = sum(
+                    request.status == CheckoutRequestStatus.Completed
+                    for request in requests
+                )
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Placed {completed} orders, "
+                        f"{len(requests) - completed} checkouts failed"
+                    )
+                )
+            elif not options["loop"]:
+                return
+            else:
+                time.sleep(options["interval"])
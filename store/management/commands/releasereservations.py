@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from store.checkout import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = "Deletes expired stock reservations"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Reservations per transaction"
+        )
+
+    def handle(self, *_, **options):
+        released = release_expired_reservations(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Released {released} reservations"))
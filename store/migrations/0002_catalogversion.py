@@ -0,0 +1,51 @@
+# Generated by Django 4.1.7 on 2026-10-18 23:18
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CatalogVersion",
+            fields=[
+                (
+                    "name",
+                    models.CharField(
+                        max_length=20,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="name",
+                    ),
+                ),
+                (
+                    "version",
+                    models.PositiveBigIntegerField(default=0, verbose_name="version"),
+                ),
+                (
+                    "modified",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        help_text="Date and time the catalog was last modified",
+                        verbose_name="modified",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Catalog version",
+                "verbose_name_plural": "Catalog versions",
+            },
+        ),
+        migrations.AlterModelOptions(
+            name="bannerimage",
+            options={
+                "ordering": ("-id",),
+                "verbose_name": "Banner image",
+                "verbose_name_plural": "Banner images",
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.1.7 on 2026-10-18 23:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0002_catalogversion"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bannerimage",
+            name="renditions",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="Resized copies of the image",
+                verbose_name="renditions",
+            ),
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="renditions",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="Resized copies of the image",
+                verbose_name="renditions",
+            ),
+        ),
+        migrations.AddField(
+            model_name="itemvariantimage",
+            name="renditions",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="Resized copies of the image",
+                verbose_name="renditions",
+            ),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.1.7 on 2026-10-18 23:24
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_items(apps, schema_editor):
+    CartItem = apps.get_model("store", "CartItem")
+    WishlistItem = apps.get_model("store", "WishlistItem")
+
+    duplicates = (
+        CartItem.objects.values("cart", "item_variant")
+        .annotate(count=Count("id"), keep=Min("id"), quantity=Sum("quantity"))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates:
+        CartItem.objects.filter(pk=duplicate["keep"]).update(
+            quantity=duplicate["quantity"]
+        )
+        CartItem.objects.filter(
+            cart=duplicate["cart"], item_variant=duplicate["item_variant"]
+        ).exclude(pk=duplicate["keep"]).delete()
+
+    duplicates = (
+        WishlistItem.objects.values("wishlist", "item_variant")
+        .annotate(count=Count("id"), keep=Min("id"))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates:
+        WishlistItem.objects.filter(
+            wishlist=duplicate["wishlist"], item_variant=duplicate["item_variant"]
+        ).exclude(pk=duplicate["keep"]).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0003_image_renditions"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="cartitem",
+            constraint=models.UniqueConstraint(
+                fields=("cart", "item_variant"),
+                name="cartitem:cart_item_variant_constraint",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="wishlistitem",
+            constraint=models.UniqueConstraint(
+                fields=("wishlist", "item_variant"),
+                name="wishlistitem:wishlist_item_variant_constraint",
+            ),
+        ),
+    ]
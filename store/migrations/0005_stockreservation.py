@@ -0,0 +1,80 @@
+# Generated by Django 4.1.7 on 2026-10-18 23:29
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("store", "0004_unique_cart_wishlist_items"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockReservation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "quantity",
+                    models.PositiveIntegerField(
+                        validators=[django.core.validators.MinValueValidator(1)],
+                        verbose_name="quantity",
+                    ),
+                ),
+                (
+                    "expires_at",
+                    models.DateTimeField(
+                        help_text="The reserved stock is released after this time",
+                        verbose_name="expires at",
+                    ),
+                ),
+                (
+                    "item_variant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reservations",
+                        to="store.itemvariant",
+                        verbose_name="item variant",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reservations",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="user",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Stock reservation",
+                "verbose_name_plural": "Stock reservations",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="stockreservation",
+            index=models.Index(
+                fields=["item_variant", "expires_at"],
+                name="store_stock_item_va_d95932_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="stockreservation",
+            constraint=models.UniqueConstraint(
+                fields=("user", "item_variant"),
+                name="stockreservation:user_item_variant_constraint",
+            ),
+        ),
+    ]
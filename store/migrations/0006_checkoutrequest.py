@@ -0,0 +1,90 @@
+# Generated by Django 4.1.7 on 2026-10-18 23:31
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("store", "0005_stockreservation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CheckoutRequest",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "lines",
+                    models.JSONField(
+                        help_text=(
+                            "[item variant ID, quantity] pairs taken from the cart"
+                        ),
+                        verbose_name="lines",
+                    ),
+                ),
+                (
+                    "status",
+                    models.SmallIntegerField(
+                        choices=[(0, "Queued"), (1, "Completed"), (2, "Failed")],
+                        default=0,
+                        verbose_name="status",
+                    ),
+                ),
+                (
+                    "detail",
+                    models.CharField(blank=True, max_length=200, verbose_name="detail"),
+                ),
+                (
+                    "timestamp",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        help_text="Date and time the checkout was requested",
+                        verbose_name="timestamp",
+                    ),
+                ),
+                (
+                    "order",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="checkout_request",
+                        to="store.order",
+                        verbose_name="order",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="checkout_requests",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="user",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Checkout request",
+                "verbose_name_plural": "Checkout requests",
+                "ordering": ("-id",),
+            },
+        ),
+        migrations.AddIndex(
+            model_name="checkoutrequest",
+            index=models.Index(
+                fields=["status", "id"], name="store_check_status_7e3d53_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 4.1.7 on 2026-10-18 23:58
+
+from django.db import migrations, models, transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 1000
+
+
+def batches(queryset):
+    """Yield the primary keys of `queryset` in chunks of `BATCH_SIZE`"""
+    last = 0
+    while True:
+        batch = list(
+            queryset.filter(pk__gt=last)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        yield batch
+        last = batch[-1]
+
+
+def backfill_totals(apps, schema_editor):
+    ItemVariant = apps.get_model("store", "ItemVariant")
+    Order = apps.get_model("store", "Order")
+    Purchase = apps.get_model("store", "Purchase")
+
+    # Historic rates are lost; the current rate is the best guess
+    rate = ItemVariant.objects.filter(pk=OuterRef("item_variant")).values("rate")
+    for batch in batches(Purchase.objects.all()):
+        with transaction.atomic():
+            Purchase.objects.filter(pk__in=batch).update(unit_rate=Subquery(rate))
+
+    purchases = (
+        Purchase.objects.filter(order=OuterRef("pk"))
+        .values("order")
+        .annotate(
+            total_quantity=Sum("quantity"),
+            total_amount=Sum(F("quantity") * F("unit_rate")),
+        )
+    )
+    for batch in batches(Order.objects.all()):
+        with transaction.atomic():
+            Order.objects.filter(pk__in=batch).update(
+                total_quantity=Coalesce(
+                    Subquery(purchases.values("total_quantity")), 0
+                ),
+                total_amount=Coalesce(Subquery(purchases.values("total_amount")), 0),
+            )
+
+
+class Migration(migrations.Migration):
+    # Every batch of the backfill is committed on its own
+    atomic = False
+
+    dependencies = [
+        ("store", "0006_checkoutrequest"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="total_amount",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Sum of the purchases at their unit rates",
+                verbose_name="total amount",
+            ),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="total_quantity",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Number of items purchased",
+                verbose_name="total quantity",
+            ),
+        ),
+        migrations.AddField(
+            model_name="purchase",
+            name="unit_rate",
+            field=models.PositiveIntegerField(
+                blank=True,
+                default=0,
+                help_text="Rate of the item variant when purchased",
+                verbose_name="unit rate",
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.1.7 on 2026-10-18 23:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0007_order_totals"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["user", "-timestamp"], name="store_order_user_id_6e21bd_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["status", "timestamp"], name="store_order_status_3b1769_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["timestamp"], name="store_order_timesta_b96b07_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="rating",
+            index=models.Index(
+                fields=["item", "rating"], name="store_ratin_item_id_1ae020_idx"
+            ),
+        ),
+    ]
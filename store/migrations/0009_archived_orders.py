@@ -0,0 +1,128 @@
+# Generated by Django 4.1.7 on 2026-10-18 23:57
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("store", "0008_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedOrder",
+            fields=[
+                (
+                    "timestamp",
+                    models.DateTimeField(
+                        help_text="Date and time the order was placed",
+                        verbose_name="timestamp",
+                    ),
+                ),
+                (
+                    "status",
+                    models.SmallIntegerField(
+                        choices=[(0, "Pending"), (1, "Delivered"), (2, "Cancelled")],
+                        default=0,
+                        verbose_name="status",
+                    ),
+                ),
+                (
+                    "total_quantity",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Number of items purchased",
+                        verbose_name="total quantity",
+                    ),
+                ),
+                (
+                    "total_amount",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Sum of the purchases at their unit rates",
+                        verbose_name="total amount",
+                    ),
+                ),
+                (
+                    "id",
+                    models.BigIntegerField(
+                        primary_key=True, serialize=False, verbose_name="id"
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.RESTRICT,
+                        related_name="archived_orders",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="user",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Archived order",
+                "verbose_name_plural": "Archived orders",
+                "ordering": ("-timestamp",),
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedPurchase",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "quantity",
+                    models.PositiveIntegerField(
+                        validators=[django.core.validators.MinValueValidator(1)],
+                        verbose_name="quantity",
+                    ),
+                ),
+                (
+                    "unit_rate",
+                    models.PositiveIntegerField(
+                        blank=True,
+                        help_text="Rate of the item variant when purchased",
+                        verbose_name="unit rate",
+                    ),
+                ),
+                (
+                    "item_variant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.RESTRICT,
+                        to="store.itemvariant",
+                        verbose_name="item variant",
+                    ),
+                ),
+                (
+                    "order",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="purchases",
+                        to="store.archivedorder",
+                        verbose_name="order",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Archived purchase",
+                "verbose_name_plural": "Archived purchases",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="archivedorder",
+            index=models.Index(
+                fields=["user", "-timestamp"], name="store_archi_user_id_c52512_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.7 on 2026-10-19 00:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0009_archived_orders"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="archivedorder",
+            index=models.Index(
+                fields=["timestamp"], name="store_archi_timesta_2a58b2_idx"
+            ),
+        ),
+    ]
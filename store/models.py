@@ -1,8 +1,10 @@
 from types import DynamicClassAttribute
 
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from django.utils.html import mark_safe
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
@@ -74,6 +76,13 @@ class Category(models.Model):
     image = models.ImageField(
         upload_to="uploads/images/categories/", blank=True, verbose_name=_("image")
     )
+    renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name=_("renditions"),
+        help_text=_("Resized copies of the image"),
+    )
     recommend = models.BooleanField(
         default=False,
         verbose_name=_("recommend"),
@@ -87,7 +96,49 @@ class Category(models.Model):
         return mark_safe(f'<img src="{self.image.url}" style="max-height: 200px;" />')
 
 
+class ItemQuerySet(models.QuerySet):
+    def with_rating(self):
+        average_rating = (
+            Rating.objects.filter(item=models.OuterRef("pk"))
+            .values("item")
+            .annotate(average=models.Avg("rating"))
+            .values("average")
+        )
+        return self.annotate(
+            average_rating=Coalesce(
+                models.Subquery(average_rating, output_field=models.FloatField()),
+                0.0,
+                output_field=models.FloatField(),
+            )
+        )
+
+    def with_details(self):
+        """Load everything `ItemSerializer` needs in a fixed number of queries"""
+        return (
+            self.select_related("user")
+            .prefetch_related("variants__images", "categories")
+            .with_rating()
+        )
+
+    def for_listing(self):
+        """Annotate the fields of `ItemListSerializer`"""
+        first_image = ItemVariantImage.objects.filter(
+            item_variant__item=models.OuterRef("pk")
+        ).order_by("item_variant_id", "id")
+        # Aggregation drops the default ordering, so restate it for pagination
+        return (
+            self.order_by(*self.model._meta.ordering)
+            .annotate(
+                min_rate=models.Min("variants__rate"),
+                image=models.Subquery(first_image.values("image")[:1]),
+            )
+            .with_rating()
+        )
+
+
 class Item(models.Model):
+    objects = ItemQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Item")
         verbose_name_plural = _("Items")
@@ -117,7 +168,20 @@ class Item(models.Model):
         return str(self.name)
 
 
+class ItemVariantQuerySet(models.QuerySet):
+    def with_available_stock(self, exclude_user=None):
+        """Annotate `available_stock`: stock not held by active reservations"""
+        return self.annotate(
+            available_stock=models.F("stock")
+            - StockReservation.objects.held(
+                models.OuterRef("pk"), exclude_user=exclude_user
+            )
+        )
+
+
 class ItemVariant(models.Model):
+    objects = ItemVariantQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Item variant")
         verbose_name_plural = _("Item variants")
@@ -152,6 +216,13 @@ class ItemVariantImage(models.Model):
     image = models.ImageField(
         upload_to="uploads/images/items/", blank=True, verbose_name=_("image")
     )
+    renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name=_("renditions"),
+        help_text=_("Resized copies of the image"),
+    )
 
     def __str__(self):
         return self.image.url
@@ -173,18 +244,12 @@ class OrderStatus(models.IntegerChoices):
         }.get(label, _("None"))
 
 
-class Order(models.Model):
+class AbstractOrder(models.Model):
+    """Fields shared by `Order` and `ArchivedOrder`"""
+
     class Meta:
-        verbose_name = _("Order")
-        verbose_name_plural = _("Orders")
-        ordering = ("-timestamp",)
+        abstract = True
 
-    user = models.ForeignKey(
-        get_user_model(),
-        on_delete=models.RESTRICT,
-        related_name="orders",
-        verbose_name=_("user"),
-    )
     timestamp = models.DateTimeField(
         verbose_name=_("timestamp"), help_text=_("Date and time the order was placed")
     )
@@ -193,9 +258,19 @@ class Order(models.Model):
         default=OrderStatus.Pending,
         verbose_name=_("status"),
     )
+    total_quantity = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("total quantity"),
+        help_text=_("Number of items purchased"),
+    )
+    total_amount = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("total amount"),
+        help_text=_("Sum of the purchases at their unit rates"),
+    )
 
     def total_items(self):
-        return sum(purchase.quantity for purchase in self.purchases.all())
+        return self.total_quantity
 
     def status_humanized(self):
         return OrderStatus(self.status).label
@@ -207,7 +282,97 @@ class Order(models.Model):
         )
 
 
-class Purchase(models.Model):
+class Order(AbstractOrder):
+    class Meta:
+        verbose_name = _("Order")
+        verbose_name_plural = _("Orders")
+        ordering = ("-timestamp",)
+        indexes = (
+            # Order history of a customer
+            models.Index(fields=["user", "-timestamp"]),
+            # Dashboard counts by status and date
+            models.Index(fields=["status", "timestamp"]),
+            models.Index(fields=["timestamp"]),
+        )
+
+    user = models.ForeignKey(
+        get_user_model(),
+        on_delete=models.RESTRICT,
+        related_name="orders",
+        verbose_name=_("user"),
+    )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        order = super().from_db(db, field_names, values)
+        order._stored_status = order.__dict__.get("status", models.DEFERRED)
+        return order
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._stored_status = self.status
+
+    def status_changed(self):
+        """
+        Whether `status` differs from the one in the database. Until `save`
+        returns (e.g. in `post_save`) it is compared with the previous status.
+        """
+        stored = getattr(self, "_stored_status", models.DEFERRED)
+        return stored is models.DEFERRED or self.status != stored
+
+    def update_totals(self):
+        """Recompute the totals from the purchases (e.g. after editing them)"""
+        totals = self.purchases.aggregate(
+            total_quantity=Coalesce(models.Sum("quantity"), 0),
+            total_amount=Coalesce(
+                models.Sum(models.F("quantity") * models.F("unit_rate")), 0
+            ),
+        )
+        for field, value in totals.items():
+            setattr(self, field, value)
+        self.save(update_fields=totals.keys())
+
+
+class LineQuerySet(models.QuerySet):
+    """Lines (purchases, cart and wishlist items) pointing at an item variant"""
+
+    def with_items(self):
+        """Load the item of every line with everything `ItemSerializer` needs"""
+        return self.select_related("item_variant").prefetch_related(
+            models.Prefetch("item_variant__item", queryset=Item.objects.with_details())
+        )
+
+
+class AbstractPurchase(models.Model):
+    """Fields shared by `Purchase` and `ArchivedPurchase`"""
+
+    objects = LineQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    item_variant = models.ForeignKey(
+        ItemVariant, on_delete=models.RESTRICT, verbose_name=_("item variant")
+    )
+    quantity = models.PositiveIntegerField(
+        validators=[MinValueValidator(1)], verbose_name=_("quantity")
+    )
+    unit_rate = models.PositiveIntegerField(
+        blank=True,
+        verbose_name=_("unit rate"),
+        help_text=_("Rate of the item variant when purchased"),
+    )
+
+    def save(self, *args, **kwargs):
+        if self.unit_rate is None:
+            self.unit_rate = self.item_variant.rate
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.quantity} x {self.item_variant.item}"
+
+
+class Purchase(AbstractPurchase):
     class Meta:
         verbose_name = _("Purchase")
         verbose_name_plural = _("Purchases")
@@ -219,18 +384,69 @@ class Purchase(models.Model):
         verbose_name=_("order"),
         help_text=_("The order this purchase is linked with"),
     )
-    item_variant = models.ForeignKey(
-        ItemVariant, on_delete=models.RESTRICT, verbose_name=_("item variant")
+
+
+class ArchivedOrder(AbstractOrder):
+    """
+    Delivered or cancelled order moved out of `Order` by `archiveorders`,
+    keeping its id.
+    """
+
+    class Meta:
+        verbose_name = _("Archived order")
+        verbose_name_plural = _("Archived orders")
+        ordering = ("-timestamp",)
+        indexes = (
+            models.Index(fields=["user", "-timestamp"]),
+            # Exports by date range
+            models.Index(fields=["timestamp"]),
+        )
+
+    id = models.BigIntegerField(primary_key=True, verbose_name=_("id"))
+    user = models.ForeignKey(
+        get_user_model(),
+        on_delete=models.RESTRICT,
+        related_name="archived_orders",
+        verbose_name=_("user"),
     )
-    quantity = models.PositiveIntegerField(
-        validators=[MinValueValidator(1)], verbose_name=_("quantity")
+
+
+class ArchivedPurchase(AbstractPurchase):
+    """Purchase of an `ArchivedOrder`, keeping the id of the `Purchase`"""
+
+    class Meta:
+        verbose_name = _("Archived purchase")
+        verbose_name_plural = _("Archived purchases")
+
+    order = models.ForeignKey(
+        ArchivedOrder,
+        related_name="purchases",
+        on_delete=models.CASCADE,
+        verbose_name=_("order"),
     )
 
-    def __str__(self):
-        return f"{self.quantity} x {self.item_variant.item}"
+
+class UserListQuerySet(models.QuerySet):
+    def for_user(self, user):
+        """The user's cart/wishlist, created on first access"""
+        return self.get_or_create(user=user)[0]
+
+
+class CartQuerySet(UserListQuerySet):
+    def with_lines(self, items=True):
+        """
+        Prefetch the lines annotated by `CartItemQuerySet.with_totals`, and
+        their items unless `items` is false.
+        """
+        lines = CartItem.objects.with_totals().order_by("id")
+        if items:
+            lines = lines.with_items()
+        return self.prefetch_related(models.Prefetch("items", queryset=lines))
 
 
 class Cart(models.Model):
+    objects = CartQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Cart")
         verbose_name_plural = _("Carts")
@@ -242,14 +458,81 @@ class Cart(models.Model):
     def clear(self):
         self.items.all().delete()
 
+    def add_item(self, item_variant, quantity=1):
+        updated = self.items.filter(item_variant=item_variant).update(
+            quantity=models.F("quantity") + quantity
+        )
+        if not updated:
+            try:
+                with transaction.atomic():
+                    CartItem.objects.create(
+                        cart=self, item_variant=item_variant, quantity=quantity
+                    )
+            except IntegrityError:
+                # Created concurrently
+                self.items.filter(item_variant=item_variant).update(
+                    quantity=models.F("quantity") + quantity
+                )
+
+    def remove_item(self, item_variant):
+        self.items.filter(item_variant=item_variant).delete()
+
+    def set_item_quantity(self, item_variant, quantity):
+        if quantity < 1:
+            return self.remove_item(item_variant)
+        CartItem.objects.bulk_create(
+            [CartItem(cart=self, item_variant=item_variant, quantity=quantity)],
+            update_conflicts=True,
+            unique_fields=["cart", "item_variant"],
+            update_fields=["quantity"],
+        )
+
+    def summary(self):
+        return self.items.aggregate(
+            lines=models.Count("id"),
+            total_quantity=Coalesce(models.Sum("quantity"), 0),
+            total=Coalesce(
+                models.Sum(models.F("quantity") * models.F("item_variant__rate")), 0
+            ),
+        )
+
     def __str__(self):
         return f"{self.user} Cart"
 
 
+class CartItemQuerySet(LineQuerySet):
+    def with_totals(self):
+        """
+        Annotate `subtotal` (rate * quantity) and `in_stock`, whether the
+        stock not held for other users covers the quantity.
+        """
+        return self.annotate(
+            subtotal=models.F("item_variant__rate") * models.F("quantity"),
+            in_stock=models.ExpressionWrapper(
+                models.Q(
+                    item_variant__stock__gte=StockReservation.objects.held(
+                        models.OuterRef("item_variant"),
+                        exclude_user=models.OuterRef("cart__user"),
+                    )
+                    + models.F("quantity")
+                ),
+                output_field=models.BooleanField(),
+            ),
+        )
+
+
 class CartItem(models.Model):
+    objects = CartItemQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Cart item")
         verbose_name_plural = _("Cart items")
+        constraints = (
+            models.constraints.UniqueConstraint(
+                fields=["cart", "item_variant"],
+                name="cartitem:cart_item_variant_constraint",
+            ),
+        )
 
     cart = models.ForeignKey(
         Cart,
@@ -265,7 +548,19 @@ class CartItem(models.Model):
         return f"{self.quantity} x {self.item_variant.item}"
 
 
+class WishlistQuerySet(UserListQuerySet):
+    def with_lines(self):
+        """Prefetch the lines and their items"""
+        return self.prefetch_related(
+            models.Prefetch(
+                "items", queryset=WishlistItem.objects.with_items().order_by("id")
+            )
+        )
+
+
 class Wishlist(models.Model):
+    objects = WishlistQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Wishlist")
         verbose_name_plural = _("Wishlist")
@@ -277,14 +572,47 @@ class Wishlist(models.Model):
     def clear(self):
         self.items.all().delete()
 
+    def move_to_cart(self, cart, item_variants=None, quantity=1):
+        """
+        Move the lines of `item_variants` (all by default) into `cart`,
+        adding `quantity` of each. Returns the ids of the moved variants.
+        """
+        with transaction.atomic():
+            lines = self.items.all()
+            if item_variants is not None:
+                lines = lines.filter(item_variant__in=item_variants)
+            moved = list(lines.order_by("id").values_list("item_variant_id", flat=True))
+            if not moved:
+                return moved
+
+            # Create the missing lines empty and add to every line after, so a
+            # line created concurrently (see `Cart.add_item`) is added to too
+            CartItem.objects.bulk_create(
+                (CartItem(cart=cart, item_variant_id=pk, quantity=0) for pk in moved),
+                ignore_conflicts=True,
+            )
+            cart.items.filter(item_variant__in=moved).update(
+                quantity=models.F("quantity") + quantity
+            )
+            self.items.filter(item_variant__in=moved).delete()
+        return moved
+
     def __str__(self):
         return f"{self.user} Wishlist"
 
 
 class WishlistItem(models.Model):
+    objects = LineQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Wishlist item")
         verbose_name_plural = _("Wishlist items")
+        constraints = (
+            models.constraints.UniqueConstraint(
+                fields=["wishlist", "item_variant"],
+                name="wishlistitem:wishlist_item_variant_constraint",
+            ),
+        )
 
     wishlist = models.ForeignKey(
         Wishlist,
@@ -310,6 +638,8 @@ class Rating(models.Model):
                 fields=["item", "user"], name="rating:item_user_constraint"
             ),
         )
+        # Covers the average rating of an item
+        indexes = (models.Index(fields=["item", "rating"]),)
 
     item = models.ForeignKey(
         Item,
@@ -342,6 +672,13 @@ class BannerImage(models.Model):
     image = models.ImageField(
         upload_to="uploads/images/banners/", verbose_name=_("image")
     )
+    renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name=_("renditions"),
+        help_text=_("Resized copies of the image"),
+    )
     for_mobile = models.BooleanField(
         default=False,
         verbose_name=_("Used in mobile devices"),
@@ -353,3 +690,128 @@ class BannerImage(models.Model):
 
     def preview(self):
         return mark_safe(f'<img src="{self.image.url}" style="max-height: 200px;" />')
+
+
+class CatalogVersion(models.Model):
+    class Meta:
+        verbose_name = _("Catalog version")
+        verbose_name_plural = _("Catalog versions")
+
+    name = models.CharField(max_length=20, primary_key=True, verbose_name=_("name"))
+    version = models.PositiveBigIntegerField(default=0, verbose_name=_("version"))
+    modified = models.DateTimeField(
+        default=timezone.now,
+        verbose_name=_("modified"),
+        help_text=_("Date and time the catalog was last modified"),
+    )
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+class StockReservationQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(expires_at__gt=timezone.now())
+
+    def expired(self):
+        return self.filter(expires_at__lte=timezone.now())
+
+    def held(self, item_variant, exclude_user=None):
+        """Expression for the quantity of `item_variant` held by active holds"""
+        reservations = self.active().filter(item_variant=item_variant)
+        if exclude_user is not None:
+            reservations = reservations.exclude(user=exclude_user)
+        return Coalesce(
+            models.Subquery(
+                reservations.values("item_variant")
+                .annotate(total=models.Sum("quantity"))
+                .values("total"),
+                output_field=models.PositiveIntegerField(),
+            ),
+            0,
+        )
+
+
+class StockReservation(models.Model):
+    objects = StockReservationQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _("Stock reservation")
+        verbose_name_plural = _("Stock reservations")
+        constraints = (
+            models.constraints.UniqueConstraint(
+                fields=["user", "item_variant"],
+                name="stockreservation:user_item_variant_constraint",
+            ),
+        )
+        indexes = (models.Index(fields=["item_variant", "expires_at"]),)
+
+    item_variant = models.ForeignKey(
+        ItemVariant,
+        on_delete=models.CASCADE,
+        related_name="reservations",
+        verbose_name=_("item variant"),
+    )
+    user = models.ForeignKey(
+        get_user_model(),
+        on_delete=models.CASCADE,
+        related_name="reservations",
+        verbose_name=_("user"),
+    )
+    quantity = models.PositiveIntegerField(
+        validators=[MinValueValidator(1)], verbose_name=_("quantity")
+    )
+    expires_at = models.DateTimeField(
+        verbose_name=_("expires at"),
+        help_text=_("The reserved stock is released after this time"),
+    )
+
+    def __str__(self):
+        return f"{self.quantity} x {self.item_variant} for {self.user}"
+
+
+class CheckoutRequestStatus(models.IntegerChoices):
+    Queued = 0, _("Queued")
+    Completed = 1, _("Completed")
+    Failed = 2, _("Failed")
+
+
+class CheckoutRequest(models.Model):
+    class Meta:
+        verbose_name = _("Checkout request")
+        verbose_name_plural = _("Checkout requests")
+        ordering = ("-id",)
+        indexes = (models.Index(fields=["status", "id"]),)
+
+    user = models.ForeignKey(
+        get_user_model(),
+        on_delete=models.CASCADE,
+        related_name="checkout_requests",
+        verbose_name=_("user"),
+    )
+    lines = models.JSONField(
+        verbose_name=_("lines"),
+        help_text=_("[item variant ID, quantity] pairs taken from the cart"),
+    )
+    status = models.SmallIntegerField(
+        choices=CheckoutRequestStatus.choices,
+        default=CheckoutRequestStatus.Queued,
+        verbose_name=_("status"),
+    )
+    order = models.OneToOneField(
+        Order,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="checkout_request",
+        verbose_name=_("order"),
+    )
+    detail = models.CharField(max_length=200, blank=True, verbose_name=_("detail"))
+    timestamp = models.DateTimeField(
+        default=timezone.now,
+        verbose_name=_("timestamp"),
+        help_text=_("Date and time the checkout was requested"),
+    )
+
+    def __str__(self):
+        return f"{self.user} {CheckoutRequestStatus(self.status).label}"
@@ -0,0 +1,97 @@
+from django.db import transaction
+
+from .models import ArchivedOrder, ArchivedPurchase, Order, OrderStatus, Purchase
+from .signals import orders_status_changed
+
+# Statuses an order may move to from each status
+ORDER_TRANSITIONS = {
+    OrderStatus.Pending: (OrderStatus.Delivered, OrderStatus.Cancelled),
+    OrderStatus.Delivered: (),
+    OrderStatus.Cancelled: (),
+}
+
+# Statuses an order can't leave, which makes it safe to archive
+ARCHIVABLE_STATUSES = [
+    source for source, targets in ORDER_TRANSITIONS.items() if not targets
+]
+
+
+def transition_orders(orders, status):
+    """
+    Move the orders with the given ids to `status` with a single UPDATE.
+
+    Orders whose current status can't move to `status` (or that don't exist)
+    are left alone. Returns `(updated, rejected)` lists of ids; once the
+    transaction commits, `orders_status_changed` is sent once for all the
+    updated orders.
+    """
+    status = OrderStatus(status)
+    sources = [
+        source for source, targets in ORDER_TRANSITIONS.items() if status in targets
+    ]
+    orders = set(orders)
+    with transaction.atomic():
+        updated = list(
+            Order.objects.select_for_update()
+            .filter(pk__in=orders, status__in=sources)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        if updated:
+            Order.objects.filter(pk__in=updated).update(status=status)
+            transaction.on_commit(
+                lambda: orders_status_changed.send(
+                    sender=Order, orders=updated, status=status
+                )
+            )
+    return updated, sorted(orders.difference(updated))
+
+
+def archive_orders(before, batch_size=1000):
+    """
+    Move delivered and cancelled orders placed before `before` (with their
+    purchases) to `ArchivedOrder` and `ArchivedPurchase`, keeping their ids,
+    so the archive can be read together with the hot tables.
+
+    Every batch of orders is copied and deleted in its own transaction, so
+    the hot tables are never locked for long. Returns the number of orders
+    archived.
+    """
+    archived = 0
+    while True:
+        with transaction.atomic():
+            orders = list(
+                Order.objects.select_for_update()
+                .filter(status__in=ARCHIVABLE_STATUSES, timestamp__lt=before)
+                .order_by("pk")[:batch_size]
+            )
+            if not orders:
+                return archived
+
+            ArchivedOrder.objects.bulk_create(
+                ArchivedOrder(
+                    id=order.pk,
+                    user_id=order.user_id,
+                    timestamp=order.timestamp,
+                    status=order.status,
+                    total_quantity=order.total_quantity,
+                    total_amount=order.total_amount,
+                )
+                for order in orders
+            )
+            ArchivedPurchase.objects.bulk_create(
+                ArchivedPurchase(
+                    id=pk,
+                    order_id=order_id,
+                    item_variant_id=item_variant_id,
+                    quantity=quantity,
+                    unit_rate=unit_rate,
+                )
+                for pk, order_id, item_variant_id, quantity, unit_rate in (
+                    Purchase.objects.filter(order__in=orders)
+                    .order_by("pk")
+                    .values_list("pk", "order", "item_variant", "quantity", "unit_rate")
+                )
+            )
+            Order.objects.filter(pk__in=[order.pk for order in orders]).delete()
+            archived += len(orders)
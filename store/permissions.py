@@ -1,6 +1,6 @@
 from rest_framework.permissions import IsAuthenticated, BasePermission
 
-from store.models import CustomerProfile, Order, Cart, Wishlist
+from store.models import CustomerProfile, ArchivedOrder, Order, Cart, Wishlist
 
 
 class IsCustomer(BasePermission):
@@ -18,6 +18,7 @@ class IsOwner(IsAuthenticated):
         return request.user.is_superuser or {
             CustomerProfile: self.owns_customer_profile,
             Order: self.owns_order,
+            ArchivedOrder: self.owns_order,
             Cart: self.owns_cart,
             Wishlist: self.owns_wishlist,
         }[type(obj)](request, view, obj)
@@ -29,7 +30,7 @@ class IsOwner(IsAuthenticated):
         return request.user == order.user
 
     def owns_cart(self, request, _, cart):
-        return request.user.cart == cart
+        return request.user.pk == cart.user_id
 
     def owns_wishlist(self, request, _, wishlist):
-        return request.user.wishlist == wishlist
+        return request.user.pk == wishlist.user_id
@@ -22,8 +22,11 @@ from store.models import (
     Order,
     OrderStatus,
     BannerImage,
+    CheckoutRequest,
+    CheckoutRequestStatus,
     Rating,
 )
+from store.images import get_media_url, get_rendition_urls
 from authentication.serializers import UserSerializer
 
 
@@ -73,10 +76,57 @@ class SignupSerializer(serializers.ModelSerializer):
 
             if customer:
                 CustomerProfile.objects.create(user=user, **customer)
+            Cart.objects.create(user=user)
+            Wishlist.objects.create(user=user)
             return user
 
 
+def sync_items(manager, items, **parent):
+    """
+    Make the lines of `manager` (e.g. `cart.items`) match `items`, keyed by
+    item variant, with at most one insert, one update and one delete.
+    """
+    model = manager.model
+    items = {item["item_variant"].pk: item for item in items}
+    with transaction.atomic():
+        existing = {line.item_variant_id: line for line in manager.all()}
+        manager.filter(item_variant__in=existing.keys() - items.keys()).delete()
+
+        changed = []
+        for pk in existing.keys() & items.keys():
+            line = existing[pk]
+            fields = {
+                field: value
+                for field, value in items[pk].items()
+                if field != "item_variant" and getattr(line, field) != value
+            }
+            if fields:
+                for field, value in fields.items():
+                    setattr(line, field, value)
+                changed.append(line)
+        if changed:
+            fields = {field for item in items.values() for field in item}
+            model.objects.bulk_update(changed, fields - {"item_variant"})
+
+        model.objects.bulk_create(
+            model(**parent, **item) for pk, item in items.items() if pk not in existing
+        )
+
+
+class RenditionsField(serializers.ReadOnlyField):
+    """URL, width and height of each rendition of the model's image"""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("source", "*")
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        return get_rendition_urls(self.context["request"], instance.renditions)
+
+
 class CategorySerializer(serializers.ModelSerializer):
+    renditions = RenditionsField()
+
     class Meta:
         model = Category
         fields = "__all__"
@@ -84,17 +134,25 @@ class CategorySerializer(serializers.ModelSerializer):
 
 class ItemVariantSerializer(serializers.ModelSerializer):
     images = serializers.SerializerMethodField()
+    renditions = serializers.SerializerMethodField()
 
     def get_images(self, item_variant):
         request = self.context["request"]
         return [
-            request.build_absolute_uri(image.image.url)
+            get_media_url(request, image.image.name)
+            for image in item_variant.images.all()
+        ]
+
+    def get_renditions(self, item_variant):
+        request = self.context["request"]
+        return [
+            get_rendition_urls(request, image.renditions)
             for image in item_variant.images.all()
         ]
 
     class Meta:
         model = ItemVariant
-        fields = ("id", "color", "rate", "stock", "images")
+        fields = ("id", "color", "rate", "stock", "images", "renditions")
 
 
 class ItemSerializer(serializers.HyperlinkedModelSerializer):
@@ -104,6 +162,8 @@ class ItemSerializer(serializers.HyperlinkedModelSerializer):
     rating = serializers.SerializerMethodField()
 
     def get_rating(self, item):
+        if hasattr(item, "average_rating"):
+            return item.average_rating
         ratings = Rating.objects.filter(item=item).aggregate(Avg("rating"))
         return ratings["rating__avg"] or 0.0
 
@@ -113,6 +173,28 @@ class ItemSerializer(serializers.HyperlinkedModelSerializer):
         extra_kwargs = {"url": {"view_name": "api:item-detail"}}
 
 
+class ItemListSerializer(serializers.ModelSerializer):
+    """
+    Lightweight item representation for cards and grids.
+
+    Expects the queryset to be annotated by `ItemQuerySet.for_listing`,
+    so no related rows are loaded.
+    """
+
+    min_rate = serializers.IntegerField(read_only=True)
+    image = serializers.SerializerMethodField()
+    rating = serializers.FloatField(source="average_rating", read_only=True)
+
+    def get_image(self, item):
+        if not item.image:
+            return None
+        return get_media_url(self.context["request"], item.image)
+
+    class Meta:
+        model = Item
+        fields = ("id", "name", "subtitle", "min_rate", "image", "rating")
+
+
 class ItemAddSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         return Item.objects.create(**validated_data)
@@ -145,7 +227,7 @@ class OrderSerializer(serializers.HyperlinkedModelSerializer):
         return reverse(
             "api:user-detail",
             request=self.context["request"],
-            kwargs={"pk": order.user.pk},
+            kwargs={"pk": order.user_id},
         )
 
     def get_status(self, order):
@@ -153,18 +235,122 @@ class OrderSerializer(serializers.HyperlinkedModelSerializer):
 
     class Meta:
         model = Order
-        fields = ("url", "user", "timestamp", "purchases", "status")
-        read_only_fields = ("timestamp",)
+        fields = (
+            "url",
+            "user",
+            "timestamp",
+            "purchases",
+            "status",
+            "total_quantity",
+            "total_amount",
+        )
+        read_only_fields = ("timestamp", "total_quantity", "total_amount")
         extra_kwargs = {"url": {"view_name": "api:order-detail"}}
 
 
-class CartItemSerializer(serializers.ModelSerializer):
-    item = serializers.SerializerMethodField()
+class PurchaseSnapshotSerializer(serializers.ModelSerializer):
+    """
+    What was bought, without the current state of the item. Expects the
+    purchases to be loaded with `select_related("item_variant__item")`.
+    """
+
+    item = serializers.IntegerField(source="item_variant.item_id", read_only=True)
+    name = serializers.CharField(source="item_variant.item.name", read_only=True)
+    color = serializers.CharField(source="item_variant.color", read_only=True)
+
+    class Meta:
+        model = Purchase
+        fields = ("item", "item_variant", "name", "color", "quantity", "unit_rate")
+
+
+class OrderCompactSerializer(OrderSerializer):
+    purchases = PurchaseSnapshotSerializer(many=True)
+
+    class Meta(OrderSerializer.Meta):
+        fields = (
+            "url",
+            "timestamp",
+            "purchases",
+            "status",
+            "total_quantity",
+            "total_amount",
+        )
+
+
+class OrderTransitionSerializer(serializers.Serializer):
+    orders = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=1000
+    )
+    status = serializers.ChoiceField(choices=OrderStatus.choices)
+
+
+class DateRangeSerializer(serializers.Serializer):
+    start = serializers.DateField()
+    end = serializers.DateField()
+
+    def validate(self, data):
+        if data["start"] > data["end"]:
+            raise ValidationError({"end": _("Must not be before start.")})
+        return data
+
+
+class OrderExportSerializer(DateRangeSerializer):
+    output = serializers.ChoiceField(choices=("csv", "ndjson"), default="csv")
+
+
+class SaleSerializer(PurchaseSnapshotSerializer):
+    """
+    A purchase of a merchant's item. Expects the purchases to be loaded with
+    `select_related("order", "item_variant__item")`.
+    """
+
+    timestamp = serializers.DateTimeField(source="order.timestamp", read_only=True)
+    status = serializers.SerializerMethodField()
+
+    def get_status(self, purchase):
+        return OrderStatus(purchase.order.status).label
+
+    class Meta(PurchaseSnapshotSerializer.Meta):
+        fields = (
+            "order",
+            "timestamp",
+            "status",
+            *PurchaseSnapshotSerializer.Meta.fields,
+        )
+
+
+class CheckoutRequestSerializer(serializers.HyperlinkedModelSerializer):
+    status = serializers.SerializerMethodField()
+
+    def get_status(self, checkout_request):
+        return CheckoutRequestStatus(checkout_request.status).label
+
+    class Meta:
+        model = CheckoutRequest
+        fields = ("url", "status", "order", "detail", "timestamp")
+        extra_kwargs = {
+            "url": {"view_name": "api:checkout-detail"},
+            "order": {"view_name": "api:order-detail"},
+        }
+
+
+class CartItemSummarySerializer(serializers.ModelSerializer):
+    """
+    Cart line without the item. Expects lines annotated by
+    `CartItemQuerySet.with_totals`.
+    """
+
+    subtotal = serializers.IntegerField(read_only=True)
+    in_stock = serializers.BooleanField(read_only=True)
 
     class Meta:
         model = CartItem
         exclude = ("id", "cart")
 
+
+class CartItemSerializer(CartItemSummarySerializer):
+    item = serializers.SerializerMethodField()
+
     def get_item(self, cart_item):
         return ItemSerializer(
             instance=cart_item.item_variant.item, context=self.context
@@ -173,10 +359,14 @@ class CartItemSerializer(serializers.ModelSerializer):
 
 class CartSerializer(serializers.HyperlinkedModelSerializer):
     items = CartItemSerializer(many=True)
+    total = serializers.SerializerMethodField()
+
+    def get_total(self, cart):
+        return sum(line.subtotal for line in cart.items.all())
 
     class Meta:
         model = Cart
-        fields = ("items",)
+        fields = ("items", "total")
 
     def update(self, cart, validated_data):
         items = validated_data["items"]
@@ -191,12 +381,62 @@ class CartSerializer(serializers.HyperlinkedModelSerializer):
                 )
             item_variant_set.add(item_variant)
 
-        cart.clear()
-        for item in items:
-            CartItem.objects.create(cart=cart, **item)
+        sync_items(cart.items, items, cart=cart)
         return cart
 
 
+class CartSummarySerializer(CartSerializer):
+    items = CartItemSummarySerializer(many=True, read_only=True)
+
+
+class CartLineSerializer(serializers.Serializer):
+    operations = ("add", "remove", "set_quantity")
+
+    op = serializers.ChoiceField(choices=operations)
+    item_variant = serializers.PrimaryKeyRelatedField(
+        queryset=ItemVariant.objects.all()
+    )
+    quantity = serializers.IntegerField(min_value=0, required=False)
+
+    def validate(self, data):
+        if data["op"] != "remove" and "quantity" not in data:
+            raise ValidationError({"quantity": _("This field is required.")})
+        if data["op"] == "add" and data["quantity"] < 1:
+            raise ValidationError({"quantity": _("Must be at least 1.")})
+        return data
+
+    def save(self, cart):
+        data = self.validated_data
+        item_variant = data["item_variant"]
+        if data["op"] == "add":
+            cart.add_item(item_variant, data["quantity"])
+        elif data["op"] == "remove":
+            cart.remove_item(item_variant)
+        else:
+            cart.set_item_quantity(item_variant, data["quantity"])
+
+        line = cart.items.filter(item_variant=item_variant).first()
+        return {
+            "item_variant": item_variant.pk,
+            "quantity": line.quantity if line else 0,
+            **cart.summary(),
+        }
+
+
+class WishlistMoveSerializer(serializers.Serializer):
+    item_variants = serializers.ListField(
+        child=serializers.IntegerField(), required=False, max_length=100
+    )
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+    def save(self, wishlist, cart):
+        data = self.validated_data
+        moved = wishlist.move_to_cart(
+            cart, item_variants=data.get("item_variants"), quantity=data["quantity"]
+        )
+        return {"moved": moved, **cart.summary()}
+
+
 class WishlistItemSerializer(serializers.ModelSerializer):
     item = serializers.SerializerMethodField()
 
@@ -230,13 +470,13 @@ class WishlistSerializer(serializers.HyperlinkedModelSerializer):
                 )
             item_variant_set.add(item_variant)
 
-        wishlist.clear()
-        for item in items:
-            WishlistItem.objects.create(wishlist=wishlist, **item)
+        sync_items(wishlist.items, items, wishlist=wishlist)
         return wishlist
 
 
 class BannerImageSerializer(serializers.ModelSerializer):
+    renditions = RenditionsField()
+
     class Meta:
         model = BannerImage
         fields = "__all__"
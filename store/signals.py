@@ -1,17 +1,77 @@
 from django.contrib.auth import get_user_model
 from django.db import models
-from django.dispatch import receiver
+from django.dispatch import Signal, receiver
 
-from .models import Cart, Wishlist
+from .catalog import bump_versions
+from .images import delete_renditions, generate_renditions
+from .models import (
+    BannerImage,
+    Category,
+    Item,
+    ItemVariant,
+    ItemVariantImage,
+    Rating,
+)
 
+# Sent with `orders` (ids) and their new `status` after a bulk status change
+orders_status_changed = Signal()
 
-@receiver(models.signals.post_save, sender=get_user_model())
-def create_cart(sender, instance, *args, **kwargs):
-    if not Cart.objects.filter(user=instance).exists():
-        Cart.objects.create(user=instance)
+# Models with an `image` whose renditions are stored in `renditions`
+RENDITION_MODELS = (Category, ItemVariantImage, BannerImage)
+
+# Catalogs whose payloads embed each model
+CATALOG_DEPENDENCIES = {
+    Item: ("item",),
+    ItemVariant: ("item",),
+    ItemVariantImage: ("item",),
+    Rating: ("item",),
+    Category: ("category", "item"),
+    BannerImage: ("banner",),
+}
+
+# The fields of their owner that items embed (see `UserSerializer`)
+ITEM_OWNER_FIELDS = {"email", "email_verified"}
+
+
+def on_catalog_changed(sender, *args, **kwargs):
+    bump_versions(*CATALOG_DEPENDENCIES[sender])
+
+
+# Connected per model: a `post_delete` receiver for every sender would stop
+# Django from fast-deleting cascaded rows, e.g. the purchases of archived orders
+for model in CATALOG_DEPENDENCIES:
+    models.signals.post_save.connect(on_catalog_changed, sender=model)
+    models.signals.post_delete.connect(on_catalog_changed, sender=model)
+
+
+@receiver(models.signals.m2m_changed, sender=Item.categories.through)
+def on_item_categories_changed(sender, action, *args, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_versions("item")
 
 
 @receiver(models.signals.post_save, sender=get_user_model())
-def create_wishlist(sender, instance, *args, **kwargs):
-    if not Wishlist.objects.filter(user=instance).exists():
-        Wishlist.objects.create(user=instance)
+def on_item_owner_changed(sender, instance, created, update_fields, *args, **kwargs):
+    # New users own nothing, and most saves (logins, password changes) are
+    # of customers, so only owners saving an embedded field bump the catalog
+    if created or (
+        update_fields is not None and not ITEM_OWNER_FIELDS & set(update_fields)
+    ):
+        return
+    if instance.items.exists():
+        bump_versions("item")
+
+
+def update_renditions(sender, instance, *args, **kwargs):
+    source = instance.image.name if instance.image else None
+    if instance.renditions.get("source") == source:
+        return
+
+    delete_renditions(instance.renditions)
+    instance.renditions = generate_renditions(instance.image) if source else {}
+    # Saving again also bumps the catalog once the renditions are in place
+    instance.save(update_fields=["renditions"])
+
+
+for model in RENDITION_MODELS:
+    models.signals.post_save.connect(update_renditions, sender=model)
@@ -1,10 +1,29 @@
+import threading
+import time
+from datetime import timedelta
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import OperationalError, connection
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework.test import APIRequestFactory, force_authenticate
 from rest_framework import status
 
-from store.models import Item, ItemVariant, CartItem
-from store.views import CartViewSet
+import store.checkout as store_checkout
+from store.models import (
+    Cart,
+    Item,
+    ItemVariant,
+    CartItem,
+    CheckoutRequest,
+    CheckoutRequestStatus,
+    Order,
+    Purchase,
+    StockReservation,
+)
+from store.views import CartViewSet, CheckoutRequestViewSet
 
 
 class CartTest(TestCase):
@@ -38,6 +57,85 @@ class CartTest(TestCase):
         response = view(request)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_cart_created_on_first_access(self):
+        # Saving a user (e.g. on login) doesn't touch carts
+        with self.assertNumQueries(1):
+            self.customer.save(update_fields=["last_login"])
+        self.assertFalse(Cart.objects.filter(user=self.customer).exists())
+
+        request = APIRequestFactory().get("/cart/")
+        force_authenticate(request, self.customer)
+        response = CartViewSet.as_view({"get": "list"})(request)
+        self.assertEqual(response.data, {"items": [], "total": 0})
+        self.assertTrue(Cart.objects.filter(user=self.customer).exists())
+
+    def test_cart_totals(self):
+        factory = APIRequestFactory()
+        view = CartViewSet.as_view({"get": "list"})
+        other_variant = ItemVariant.objects.create(
+            item=self.item, rate=5, stock=1, color="White"
+        )
+        CartItem.objects.create(
+            cart=Cart.objects.for_user(self.customer),
+            item_variant=self.item_variant,
+            quantity=2,
+        )
+        CartItem.objects.create(
+            cart=Cart.objects.for_user(self.customer),
+            item_variant=other_variant,
+            quantity=3,
+        )
+        # Held by another customer
+        StockReservation.objects.create(
+            user=get_user_model().objects.create(email="other@example.com"),
+            item_variant=self.item_variant,
+            quantity=1,
+            expires_at=timezone.now() + timedelta(minutes=1),
+        )
+
+        request = factory.get("/cart/", {"summary": "1"})
+        force_authenticate(request, self.customer)
+        with self.assertNumQueries(2):
+            response = view(request)
+        self.assertEqual(
+            response.data,
+            {
+                "items": [
+                    {
+                        "item_variant": self.item_variant.pk,
+                        "quantity": 2,
+                        "subtotal": 4,
+                        "in_stock": False,
+                    },
+                    {
+                        "item_variant": other_variant.pk,
+                        "quantity": 3,
+                        "subtotal": 15,
+                        "in_stock": False,
+                    },
+                ],
+                "total": 19,
+            },
+        )
+
+        # The full cart loads the items in a fixed number of queries
+        request = factory.get("/cart/")
+        force_authenticate(request, self.customer)
+        with self.assertNumQueries(6):
+            view(request)
+
+        # The customer's own holds count as available
+        StockReservation.objects.update(user=self.customer)
+        CartItem.objects.filter(item_variant=other_variant).update(quantity=1)
+        request = factory.get("/cart/")
+        force_authenticate(request, self.customer)
+        response = view(request)
+        self.assertEqual(
+            [line["in_stock"] for line in response.data["items"]], [True, True]
+        )
+        self.assertEqual(response.data["total"], 9)
+        self.assertEqual(response.data["items"][0]["item"]["name"], "item")
+
     def test_checkout(self):
         factory = APIRequestFactory()
         view = CartViewSet.as_view({"get": "checkout"})
@@ -53,13 +151,20 @@ class CartTest(TestCase):
 
         # Normal
         CartItem.objects.create(
-            cart=self.customer.cart, item_variant=self.item_variant, quantity=1
+            cart=Cart.objects.for_user(self.customer),
+            item_variant=self.item_variant,
+            quantity=1,
         )
         force_authenticate(request, self.customer)
         response = view(request)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(self.customer.orders.all().count(), 1)
-        self.assertEqual(self.customer.cart.items.all().count(), 0)
+        self.assertEqual(Cart.objects.for_user(self.customer).items.all().count(), 0)
+        # Totals and rates are kept on the order
+        order = self.customer.orders.get()
+        self.assertEqual((order.total_quantity, order.total_amount), (1, 2))
+        ItemVariant.objects.filter(pk=self.item_variant.pk).update(rate=3)
+        self.assertEqual(order.purchases.get().unit_rate, 2)
         self.item_variant = ItemVariant.objects.get(
             pk=self.item_variant.pk
         )  # Requery database
@@ -67,7 +172,9 @@ class CartTest(TestCase):
 
         # Check when quantity > stock
         CartItem.objects.create(
-            cart=self.customer.cart, item_variant=self.item_variant, quantity=5
+            cart=Cart.objects.for_user(self.customer),
+            item_variant=self.item_variant,
+            quantity=5,
         )
         force_authenticate(request, self.customer)
         response = view(request)
@@ -77,6 +184,45 @@ class CartTest(TestCase):
         )  # Requery database
         self.assertEqual(self.item_variant.stock, 1)
 
+    def test_checkout_idempotency(self):
+        factory = APIRequestFactory()
+        view = CartViewSet.as_view({"post": "checkout"})
+        CartItem.objects.create(
+            cart=Cart.objects.for_user(self.customer),
+            item_variant=self.item_variant,
+            quantity=1,
+        )
+
+        def checkout(key, path="/cart/checkout/", data=None):
+            request = factory.post(path, data, format="json", HTTP_IDEMPOTENCY_KEY=key)
+            force_authenticate(request, self.customer)
+            return view(request)
+
+        response = checkout("key")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # A retry replays the response instead of checking out the empty cart
+        CartItem.objects.create(
+            cart=Cart.objects.for_user(self.customer),
+            item_variant=self.item_variant,
+            quantity=1,
+        )
+        response = checkout("key")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Idempotent-Replayed"], "true")
+        self.assertEqual(self.customer.orders.count(), 1)
+        self.assertEqual(Cart.objects.for_user(self.customer).items.count(), 1)
+
+        response = checkout("key", path="/cart/other/")
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        # Same path, different body
+        response = checkout("key", data={"note": "other"})
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+        response = checkout("another key")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.customer.orders.count(), 2)
+
     def test_put_cart(self):
         factory = APIRequestFactory()
         view = CartViewSet.put
@@ -105,7 +251,9 @@ class CartTest(TestCase):
 
         # Authenticated, but invalid data
         CartItem.objects.create(
-            cart=self.customer.cart, quantity=1, item_variant=self.item_variant
+            cart=Cart.objects.for_user(self.customer),
+            quantity=1,
+            item_variant=self.item_variant,
         )
         request = factory.put("/cart/", data={}, format="json")
         force_authenticate(request, self.customer)
@@ -135,3 +283,339 @@ class CartTest(TestCase):
         request = Request(request, parsers=[JSONParser()])
         response = view(request)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_put_cart_diff(self):
+        factory = APIRequestFactory()
+        view = CartViewSet.put
+
+        from rest_framework.request import Request
+        from rest_framework.parsers import JSONParser
+
+        item_variants = [self.item_variant] + [
+            ItemVariant.objects.create(item=self.item, rate=2, stock=5, color=color)
+            for color in ("Red", "Green")
+        ]
+        cart = Cart.objects.for_user(self.customer)
+        for item_variant in item_variants[:2]:
+            CartItem.objects.create(cart=cart, item_variant=item_variant, quantity=1)
+        kept = CartItem.objects.get(cart=cart, item_variant=item_variants[0])
+
+        # Keep one line, change one quantity, drop one line and add one line
+        data = {
+            "items": [
+                {"item_variant": item_variants[0].pk, "quantity": 1},
+                {"item_variant": item_variants[2].pk, "quantity": 3},
+            ]
+        }
+        request = factory.put("/cart/", data=data, format="json")
+        force_authenticate(request, self.customer)
+        response = view(Request(request, parsers=[JSONParser()]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(cart.items.order_by("id").values_list("item_variant", "quantity")),
+            [(item_variants[0].pk, 1), (item_variants[2].pk, 3)],
+        )
+        # Unchanged lines are left alone
+        self.assertTrue(CartItem.objects.filter(pk=kept.pk).exists())
+
+        data["items"][1]["quantity"] = 2
+        request = factory.put("/cart/", data=data, format="json")
+        force_authenticate(request, self.customer)
+        request = Request(request, parsers=[JSONParser()])
+        with CaptureQueriesContext(connection) as context:
+            view(request)
+        writes = [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith(("INSERT", "UPDATE", "DELETE"))
+        ]
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(cart.items.get(item_variant=item_variants[2]).quantity, 2)
+
+    def test_patch_cart(self):
+        factory = APIRequestFactory()
+        view = CartViewSet.patch
+
+        from rest_framework.request import Request
+        from rest_framework.parsers import JSONParser
+        from rest_framework.exceptions import ValidationError
+
+        def patch(data, user=self.customer):
+            request = factory.patch("/cart/", data=data, format="json")
+            if user:
+                force_authenticate(request, user)
+            return view(Request(request, parsers=[JSONParser()]))
+
+        line = {"item_variant": self.item_variant.pk}
+        response = patch({"op": "add", "quantity": 1, **line}, user=None)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        for data in (
+            {"op": "add", **line},
+            {"op": "add", "quantity": 0, **line},
+            {"op": "replace", "quantity": 1, **line},
+        ):
+            with self.assertRaises(ValidationError):
+                patch(data)
+
+        response = patch({"op": "add", "quantity": 2, **line})
+        self.assertEqual(
+            response.data,
+            {
+                "item_variant": self.item_variant.pk,
+                "quantity": 2,
+                "lines": 1,
+                "total_quantity": 2,
+                "total": 4,
+            },
+        )
+        # Existing lines are incremented in place
+        with self.assertNumQueries(5):
+            response = patch({"op": "add", "quantity": 1, **line})
+        self.assertEqual(response.data["quantity"], 3)
+
+        response = patch({"op": "set_quantity", "quantity": 5, **line})
+        self.assertEqual(response.data["quantity"], 5)
+        self.assertEqual(Cart.objects.for_user(self.customer).items.get().quantity, 5)
+
+        response = patch({"op": "remove", **line})
+        self.assertEqual(
+            response.data,
+            {
+                "item_variant": self.item_variant.pk,
+                "quantity": 0,
+                "lines": 0,
+                "total_quantity": 0,
+                "total": 0,
+            },
+        )
+
+    def test_reserve(self):
+        factory = APIRequestFactory()
+        reserve = CartViewSet.as_view({"post": "reserve"})
+        checkout = CartViewSet.as_view({"get": "checkout"})
+        other = get_user_model().objects.create(email="other@example.com")
+
+        request = factory.post("/cart/reserve/")
+        self.assertNotEqual(reserve(request).status_code, status.HTTP_200_OK)
+
+        # Can't reserve an empty cart
+        force_authenticate(request, self.customer)
+        response = reserve(request)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        CartItem.objects.create(
+            cart=Cart.objects.for_user(self.customer),
+            item_variant=self.item_variant,
+            quantity=2,
+        )
+        response = reserve(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Reserving again replaces the previous holds
+        self.assertEqual(reserve(request).status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            ItemVariant.objects.with_available_stock()
+            .get(pk=self.item_variant.pk)
+            .available_stock,
+            0,
+        )
+
+        # The held stock can't be reserved or bought by others
+        CartItem.objects.create(
+            cart=Cart.objects.for_user(other),
+            item_variant=self.item_variant,
+            quantity=1,
+        )
+        request = factory.post("/cart/reserve/")
+        force_authenticate(request, other)
+        self.assertEqual(reserve(request).status_code, status.HTTP_400_BAD_REQUEST)
+        request = factory.get("/cart/checkout/")
+        force_authenticate(request, other)
+        self.assertEqual(checkout(request).status_code, status.HTTP_400_BAD_REQUEST)
+
+        # The holder checks out their held stock
+        request = factory.get("/cart/checkout/")
+        force_authenticate(request, self.customer)
+        self.assertEqual(checkout(request).status_code, status.HTTP_200_OK)
+        self.assertFalse(StockReservation.objects.exists())
+        self.item_variant.refresh_from_db()
+        self.assertEqual(self.item_variant.stock, 0)
+
+    def test_release_expired_reservations(self):
+        now = timezone.now()
+        other = get_user_model().objects.create(email="other@example.com")
+        for user, expires_at in (
+            (self.customer, now - timedelta(seconds=1)),
+            (other, now + timedelta(minutes=1)),
+        ):
+            StockReservation.objects.create(
+                user=user,
+                item_variant=self.item_variant,
+                quantity=1,
+                expires_at=expires_at,
+            )
+        self.assertEqual(
+            ItemVariant.objects.with_available_stock()
+            .get(pk=self.item_variant.pk)
+            .available_stock,
+            1,
+        )
+        self.assertEqual(store_checkout.release_expired_reservations(batch_size=1), 1)
+        self.assertEqual(StockReservation.objects.get().user, other)
+
+    @override_settings(CHECKOUT_ASYNC=True)
+    def test_queued_checkout_idempotency(self):
+        factory = APIRequestFactory()
+        checkout = CartViewSet.as_view({"post": "checkout"})
+        CartItem.objects.create(
+            cart=Cart.objects.for_user(self.customer),
+            item_variant=self.item_variant,
+            quantity=1,
+        )
+        responses = []
+        for _ in range(2):
+            request = factory.post("/cart/checkout/", HTTP_IDEMPOTENCY_KEY="key")
+            force_authenticate(request, self.customer)
+            responses.append(checkout(request))
+        first, retry = responses
+        # The retry gets the queued request again, Location included
+        self.assertEqual(retry.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry["Location"], first["Location"])
+        self.assertEqual(CheckoutRequest.objects.count(), 1)
+
+    @override_settings(CHECKOUT_ASYNC=True)
+    def test_queued_checkout(self):
+        factory = APIRequestFactory()
+        checkout = CartViewSet.as_view({"post": "checkout"})
+        detail = CheckoutRequestViewSet.as_view({"get": "retrieve"})
+        other = get_user_model().objects.create(email="other@example.com")
+
+        responses = []
+        for user, quantity in ((self.customer, 2), (other, 1)):
+            CartItem.objects.create(
+                cart=Cart.objects.for_user(user),
+                item_variant=self.item_variant,
+                quantity=quantity,
+            )
+            request = factory.post("/cart/checkout/")
+            force_authenticate(request, user)
+            response = checkout(request)
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            self.assertEqual(response["Location"], response.data["url"])
+            self.assertEqual(response.data["status"], "Queued")
+            self.assertFalse(Cart.objects.for_user(user).items.exists())
+            responses.append(response)
+        # Nothing is taken until the queue is processed
+        self.item_variant.refresh_from_db()
+        self.assertEqual(self.item_variant.stock, self.stock)
+
+        # Both fit the stock when queued, but only the first one gets it
+        processed = store_checkout.process_checkout_requests()
+        self.assertEqual(
+            [request.status for request in processed],
+            [CheckoutRequestStatus.Completed, CheckoutRequestStatus.Failed],
+        )
+        self.item_variant.refresh_from_db()
+        self.assertEqual(self.item_variant.stock, 0)
+        self.assertEqual(self.customer.orders.get().purchases.get().quantity, 2)
+        self.assertFalse(other.orders.exists())
+        # The failed checkout's items are back in the cart
+        self.assertEqual(Cart.objects.for_user(other).items.get().quantity, 1)
+        self.assertEqual(store_checkout.process_checkout_requests(), [])
+
+        pk = processed[1].pk
+        request = factory.get(f"/checkout/{pk}/")
+        force_authenticate(request, self.customer)
+        self.assertEqual(detail(request, pk=pk).status_code, status.HTTP_404_NOT_FOUND)
+        force_authenticate(request, other)
+        response = detail(request, pk=pk)
+        self.assertEqual(response.data["status"], "Failed")
+        self.assertIsNone(response.data["order"])
+
+    def test_process_checkout_requests_batch(self):
+        users = [
+            get_user_model().objects.create(email=f"user{i}@example.com")
+            for i in range(3)
+        ]
+        for user in users:
+            CheckoutRequest.objects.create(user=user, lines=[[self.item_variant.pk, 1]])
+
+        with CaptureQueriesContext(connection) as context:
+            processed = store_checkout.process_checkout_requests(batch_size=2)
+        # The stock of the whole batch is taken at once
+        self.assertEqual(
+            sum(
+                query["sql"].startswith('UPDATE "store_itemvariant"')
+                for query in context.captured_queries
+            ),
+            1,
+        )
+        self.assertEqual(
+            [request.status for request in processed],
+            [CheckoutRequestStatus.Completed] * 2,
+        )
+        self.item_variant.refresh_from_db()
+        self.assertEqual(self.item_variant.stock, 0)
+
+        # Out of stock for the third
+        processed = store_checkout.process_checkout_requests()
+        self.assertEqual(processed[0].status, CheckoutRequestStatus.Failed)
+        self.assertEqual(Cart.objects.for_user(users[2]).items.get().quantity, 1)
+
+
+class CheckoutConcurrencyTest(TransactionTestCase):
+    customers = 8
+
+    def setUp(self):
+        merchant = get_user_model().objects.create(email="merchant@example.com")
+        item = Item.objects.create(user=merchant, name="item", description="d")
+        self.stock = 5
+        self.item_variant = ItemVariant.objects.create(
+            item=item, rate=2, stock=self.stock, color="Black"
+        )
+        self.users = []
+        for i in range(self.customers):
+            user = get_user_model().objects.create(email=f"customer{i}@example.com")
+            CartItem.objects.create(
+                cart=Cart.objects.for_user(user),
+                item_variant=self.item_variant,
+                quantity=2,
+            )
+            self.users.append(user)
+
+    def test_concurrent_checkouts_never_oversell(self):
+        barrier = threading.Barrier(self.customers)
+        results = []
+
+        def run(user):
+            barrier.wait()
+            try:
+                # SQLite allows a single writer, retry when the table is locked
+                for _ in range(200):
+                    try:
+                        store_checkout.checkout(Cart.objects.get(user=user), user)
+                        results.append("ordered")
+                        return
+                    except OperationalError:
+                        time.sleep(0.01)
+                    except store_checkout.OutOfStock:
+                        results.append("out of stock")
+                        return
+                results.append("locked")
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(user,)) for user in self.users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.item_variant.refresh_from_db()
+        ordered = Purchase.objects.aggregate(total=Sum("quantity"))["total"] or 0
+        self.assertGreaterEqual(self.item_variant.stock, 0)
+        self.assertEqual(self.item_variant.stock + ordered, self.stock)
+        self.assertEqual(Order.objects.count(), results.count("ordered"))
+        self.assertEqual(results.count("ordered"), self.stock // 2)
+        self.assertEqual(self.item_variant.stock, self.stock % 2)
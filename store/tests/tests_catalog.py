@@ -0,0 +1,193 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework import status
+
+from store.catalog import get_cache_stats, get_versions, reset_cache_stats
+from store.checkout import checkout
+from store.models import Cart, Category, Item, ItemVariant
+from store.views import CatalogCacheViewSet, CategoryViewSet, ItemViewSet
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        self.merchant = get_user_model().objects.create(email="merchant@example.com")
+        self.item = Item.objects.create(
+            user=self.merchant, name="item", description="description"
+        )
+        self.factory = APIRequestFactory()
+
+    def test_etag_revalidation(self):
+        view = ItemViewSet.as_view({"get": "list"})
+
+        response = view(self.factory.get("/item/", HTTP_ACCEPT="application/json"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+        self.assertTrue(response.has_header("Last-Modified"))
+
+        # Only the version lookup runs when nothing has changed
+        request = self.factory.get(
+            "/item/", HTTP_ACCEPT="application/json", HTTP_IF_NONE_MATCH=etag
+        )
+        with self.assertNumQueries(1):
+            response = view(request)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+        # Other query strings are different representations
+        request = self.factory.get(
+            "/item/?compact=1", HTTP_ACCEPT="application/json", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(view(request).status_code, status.HTTP_200_OK)
+
+        ItemVariant.objects.create(item=self.item, color="Red", rate=1, stock=1)
+        request = self.factory.get(
+            "/item/", HTTP_ACCEPT="application/json", HTTP_IF_NONE_MATCH=etag
+        )
+        response = view(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_category_changes_invalidate_items(self):
+        item_view = ItemViewSet.as_view({"get": "retrieve"})
+        category_view = CategoryViewSet.as_view({"get": "list"})
+
+        request = self.factory.get("/item/", HTTP_ACCEPT="application/json")
+        item_etag = item_view(request, pk=self.item.pk)["ETag"]
+        request = self.factory.get("/category/", HTTP_ACCEPT="application/json")
+        category_etag = category_view(request)["ETag"]
+
+        category = Category.objects.create(name="category", description="text")
+        request = self.factory.get(
+            "/category/",
+            HTTP_ACCEPT="application/json",
+            HTTP_IF_NONE_MATCH=category_etag,
+        )
+        self.assertEqual(category_view(request).status_code, status.HTTP_200_OK)
+
+        request = self.factory.get("/item/", HTTP_ACCEPT="application/json")
+        etag = item_view(request, pk=self.item.pk)["ETag"]
+        self.assertNotEqual(etag, item_etag)
+
+        self.item.categories.add(category)
+        request = self.factory.get(
+            "/item/", HTTP_ACCEPT="application/json", HTTP_IF_NONE_MATCH=etag
+        )
+        response = item_view(request, pk=self.item.pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_owner_changes_invalidate_items(self):
+        customer = get_user_model().objects.create(email="customer@example.com")
+        version = get_versions(["item"])["item"]
+
+        # Saves of users without items and of fields items don't embed
+        customer.set_password("password")
+        customer.save()
+        self.merchant.save(update_fields=["last_login", "password"])
+        self.assertEqual(get_versions(["item"])["item"], version)
+
+        self.merchant.email_verified = True
+        self.merchant.save(update_fields=["email_verified"])
+        self.assertNotEqual(get_versions(["item"])["item"], version)
+
+    def test_checkout_invalidates_items(self):
+        item_variant = ItemVariant.objects.create(
+            item=self.item, color="Red", rate=1, stock=5
+        )
+        view = ItemViewSet.as_view({"get": "retrieve"})
+        request = self.factory.get("/item/", HTTP_ACCEPT="application/json")
+        etag = view(request, pk=self.item.pk)["ETag"]
+
+        customer = get_user_model().objects.create(email="customer@example.com")
+        cart = Cart.objects.for_user(customer)
+        cart.add_item(item_variant, 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            checkout(cart, customer)
+
+        request = self.factory.get(
+            "/item/", HTTP_ACCEPT="application/json", HTTP_IF_NONE_MATCH=etag
+        )
+        response = view(request, pk=self.item.pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data["variants"][0]["stock"], 3)
+
+
+class CachedResponseTest(TestCase):
+    def setUp(self):
+        self.merchant = get_user_model().objects.create(email="merchant@example.com")
+        self.item = Item.objects.create(
+            user=self.merchant, name="item", description="description"
+        )
+        self.factory = APIRequestFactory()
+        reset_cache_stats()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_anonymous_responses_are_cached(self):
+        view = ItemViewSet.as_view({"get": "list"})
+
+        response = view(self.factory.get("/item/?search=item&compact=1"))
+        response.render()
+        self.assertEqual(response["X-Cache"], "MISS")
+
+        # Query parameter order doesn't matter
+        with self.assertNumQueries(1):
+            cached = view(self.factory.get("/item/?compact=1&search=item"))
+        self.assertEqual(cached["X-Cache"], "HIT")
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(get_cache_stats()["hits"], 1)
+        self.assertEqual(get_cache_stats()["misses"], 1)
+
+        # Catalog changes invalidate the entry
+        self.item.name = "item renamed"
+        self.item.save()
+        response = view(self.factory.get("/item/?search=item&compact=1"))
+        response.render()
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertIn(b"renamed", response.content)
+
+    @override_settings(ALLOWED_HOSTS=["testserver", "shop.example.com"])
+    def test_cache_is_per_host_and_scheme(self):
+        view = ItemViewSet.as_view({"get": "list"})
+        view(self.factory.get("/item/")).render()
+
+        # Payloads hold absolute URLs
+        for extra in ({"HTTP_HOST": "shop.example.com"}, {"secure": True}):
+            response = view(self.factory.get("/item/", **extra))
+            response.render()
+            self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(view(self.factory.get("/item/"))["X-Cache"], "HIT")
+
+    def test_browsable_api_is_not_cached(self):
+        view = ItemViewSet.as_view({"get": "list"})
+        for _ in range(2):
+            response = view(self.factory.get("/item/", HTTP_ACCEPT="text/html"))
+            response.render()
+            self.assertFalse(response.has_header("X-Cache"))
+
+    def test_authenticated_responses_are_not_cached(self):
+        view = ItemViewSet.as_view({"get": "list"})
+        for _ in range(2):
+            request = self.factory.get("/item/")
+            force_authenticate(request, self.merchant)
+            response = view(request)
+            response.render()
+            self.assertFalse(response.has_header("X-Cache"))
+
+    def test_cache_stats(self):
+        view = CatalogCacheViewSet.as_view({"get": "list"})
+
+        request = self.factory.get("/catalog_cache/")
+        force_authenticate(request, self.merchant)
+        self.assertEqual(view(request).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.merchant.is_staff = True
+        self.merchant.save()
+        request = self.factory.get("/catalog_cache/")
+        force_authenticate(request, self.merchant)
+        response = view(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"hits": 0, "misses": 0, "hit_ratio": 0.0})
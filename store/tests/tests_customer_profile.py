@@ -4,6 +4,7 @@ from django.test import TestCase
 from rest_framework import status
 from rest_framework.test import APIRequestFactory, force_authenticate
 
+from core.models import IdempotencyKey
 from store.models import CustomerProfile
 from store.views import CustomerProfileViewSet
 from authentication.views import TokenViewSet
@@ -113,6 +114,42 @@ class CustomerProfileTest(TestCase):
         response = view(request)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
+    def test_post_customer_profile_idempotency(self):
+        factory = APIRequestFactory()
+        view = CustomerProfileViewSet.as_view({"post": "create"})
+        data = {
+            "email": "first@example.com",
+            "password": "shark@123",
+            "customer": {
+                "first_name": "First",
+                "last_name": "Customer",
+                "address": "Kathmandu",
+                "contact": "+9779840424012",
+            },
+        }
+
+        def signup(data):
+            request = factory.post(
+                "/customer/", data=data, format="json", HTTP_IDEMPOTENCY_KEY="key"
+            )
+            return view(request)
+
+        self.assertEqual(signup(data).status_code, status.HTTP_201_CREATED)
+        response = signup(data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response["Idempotent-Replayed"], "true")
+
+        # Another anonymous client reusing the key doesn't get the first signup
+        other = {**data, "email": "second@example.com"}
+        response = signup(other)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(response.has_header("Idempotent-Replayed"))
+        self.assertEqual(response.data["email"], "second@example.com")
+        # Anonymous scopes embed the request fingerprint and must fit the column
+        max_length = IdempotencyKey._meta.get_field("scope").max_length
+        for scope in IdempotencyKey.objects.values_list("scope", flat=True):
+            self.assertLessEqual(len(scope), max_length)
+
     def test_put_customer_profile(self):
         factory = APIRequestFactory()
         view = CustomerProfileViewSet.as_view({"put": "update"})
@@ -0,0 +1,83 @@
+import io
+import shutil
+import tempfile
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework import status
+
+from store.models import Item, ItemVariant, ItemVariantImage, Category
+from store.views import CategoryViewSet, ItemViewSet
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def create_image(name, size=(1200, 800)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "green").save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_BASE_URL=None)
+class RenditionTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.merchant = get_user_model().objects.create(email="merchant@example.com")
+        self.item = Item.objects.create(
+            user=self.merchant, name="item", description="description"
+        )
+        self.item_variant = ItemVariant.objects.create(
+            item=self.item, rate=2, stock=2, color="Black"
+        )
+        self.factory = APIRequestFactory()
+
+    def test_renditions_generated_on_upload(self):
+        image = ItemVariantImage.objects.create(
+            item_variant=self.item_variant, image=create_image("carrot.png")
+        )
+        image.refresh_from_db()
+        self.assertEqual(image.renditions["source"], image.image.name)
+        self.assertEqual(
+            (image.renditions["card"]["width"], image.renditions["card"]["height"]),
+            (480, 320),
+        )
+        self.assertTrue(image.renditions["thumbnail"]["name"].endswith(".webp"))
+
+        # Unchanged images aren't rendered again
+        renditions = image.renditions
+        image.save()
+        image.refresh_from_db()
+        self.assertEqual(image.renditions, renditions)
+
+        view = ItemViewSet.as_view({"get": "retrieve"})
+        response = view(self.factory.get("/item/"), pk=self.item.pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        variant = response.data["variants"][0]
+        self.assertEqual(
+            variant["images"], [f"http://testserver/media/{image.image.name}"]
+        )
+        self.assertEqual(
+            variant["renditions"][0]["thumbnail"]["url"],
+            f"http://testserver/media/{renditions['thumbnail']['name']}",
+        )
+
+    def test_media_base_url(self):
+        Category.objects.create(
+            name="category", description="text", image=create_image("veg.png")
+        )
+        view = CategoryViewSet.as_view({"get": "list"})
+        with self.settings(MEDIA_BASE_URL="https://cdn.example.com/"):
+            response = view(self.factory.get("/category/"))
+        renditions = response.data["results"][0]["renditions"]
+        self.assertEqual(set(renditions), {"thumbnail", "card", "full"})
+        self.assertTrue(
+            renditions["full"]["url"].startswith("https://cdn.example.com/uploads/")
+        )
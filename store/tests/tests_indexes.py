@@ -0,0 +1,81 @@
+from datetime import timedelta
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from store.models import Item, Order, OrderStatus, Purchase, Rating
+
+
+def index_name(model, *fields):
+    return next(
+        index.name for index in model._meta.indexes if tuple(index.fields) == fields
+    )
+
+
+@skipUnless(connection.vendor == "sqlite", "Query plans are SQLite specific")
+class HotPathIndexTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(email="customer@example.com")
+        self.item = Item.objects.create(
+            user=self.user, name="item", description="description"
+        )
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(f"INDEX {index}", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_order_history(self):
+        self.assertUsesIndex(
+            Order.objects.filter(user=self.user).order_by("-timestamp"),
+            index_name(Order, "user", "-timestamp"),
+        )
+
+    def test_orders_by_status(self):
+        self.assertUsesIndex(
+            Order.objects.filter(status=OrderStatus.Pending).values("pk"),
+            index_name(Order, "status", "timestamp"),
+        )
+
+    def test_orders_by_date(self):
+        today = timezone.now()
+        self.assertUsesIndex(
+            Order.objects.filter(
+                timestamp__gte=today - timedelta(days=1), timestamp__lte=today
+            ),
+            index_name(Order, "timestamp"),
+        )
+
+    def test_ratings(self):
+        # SQLite backs the unique constraint with an automatic index
+        plan = Rating.objects.filter(user=self.user, item=self.item).explain()
+        self.assertIn("USING INDEX sqlite_autoindex_store_rating", plan)
+        self.assertIn("item_id=? AND user_id=?", plan)
+        self.assertUsesIndex(
+            Rating.objects.filter(item=self.item).values("rating"),
+            index_name(Rating, "item", "rating"),
+        )
+
+    def test_active_users(self):
+        self.assertUsesIndex(
+            get_user_model()
+            .objects.filter(last_login__gte=timezone.now() - timedelta(days=30))
+            .order_by()
+            .values("pk"),
+            index_name(get_user_model(), "last_login"),
+        )
+
+    def test_merchant_sales(self):
+        # Starts from the merchant's items and follows the foreign key indexes
+        # down to their purchases, whatever the size of the purchase table
+        plan = (
+            Purchase.objects.filter(item_variant__item__user=self.user)
+            .order_by("-id")
+            .explain()
+        )
+        self.assertIn("SEARCH store_item USING COVERING INDEX", plan)
+        self.assertIn("SEARCH store_purchase USING INDEX", plan)
+        self.assertNotIn("SCAN store_purchase", plan)
@@ -4,7 +4,7 @@ from django.contrib.auth import get_user_model
 from rest_framework.test import APIRequestFactory, force_authenticate
 from rest_framework import status
 
-from store.models import Item, Rating, MerchantProfile
+from store.models import Item, ItemVariant, Rating, MerchantProfile
 from store.views import ItemViewSet
 
 
@@ -38,6 +38,64 @@ class ItemTest(TestCase):
         response = view(request)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_get_item_list_compact(self):
+        factory = APIRequestFactory()
+        view = ItemViewSet.as_view({"get": "list"})
+        ItemVariant.objects.create(item=self.item, color="Red", rate=5, stock=1)
+        ItemVariant.objects.create(item=self.item, color="Blue", rate=3, stock=1)
+        Rating.objects.create(user=self.customer, item=self.item, rating=4)
+        Rating.objects.create(user=self.merchant, item=self.item, rating=2)
+
+        request = factory.get("/item/", {"compact": "1"})
+        with self.assertNumQueries(3):
+            response = view(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["results"],
+            [
+                {
+                    "id": self.item.pk,
+                    "name": "Name",
+                    "subtitle": "",
+                    "min_rate": 3,
+                    "image": None,
+                    "rating": 3.0,
+                }
+            ],
+        )
+
+    def test_get_item_batch(self):
+        factory = APIRequestFactory()
+        view = ItemViewSet.as_view({"get": "list"})
+        items = [
+            Item.objects.create(user=self.merchant, name=f"item{i}", description="d")
+            for i in range(3)
+        ]
+        for item in items:
+            ItemVariant.objects.create(item=item, color="Red", rate=1, stock=1)
+        missing = items[-1].pk + 100
+        ids = [items[2].pk, missing, items[0].pk, items[2].pk]
+
+        request = factory.get("/item/", {"ids": ",".join(map(str, ids))})
+        # Catalog versions, items (with rating and owner), variants, images and
+        # categories regardless of the number of items
+        with self.assertNumQueries(5):
+            response = view(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item["name"] for item in response.data["results"]], ["item2", "item0"]
+        )
+        self.assertEqual(response.data["missing"], [missing])
+
+        for ids in ("a,b", "", ",".join(map(str, range(1, 102)))):
+            response = view(factory.get("/item/", {"ids": ids}))
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Filtered out items aren't missing, so filters are refused
+        for params in ({"search": "item1"}, {"categories": 1}):
+            request = factory.get("/item/", {"ids": items[0].pk, **params})
+            self.assertEqual(view(request).status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_get_item(self):
         factory = APIRequestFactory()
         view = ItemViewSet.as_view({"get": "retrieve"})
@@ -1,11 +1,29 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+from django.core import mail
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 from rest_framework.test import APIRequestFactory, force_authenticate
 from rest_framework import status
 
-from store.models import Item, ItemVariant, Order, Purchase
-from store.views import OrderViewSet
+from emails.models import OrderNotification, OutboxMessage
+from emails.notifications import send_order_digests
+from emails.outbox import deliver_outbox
+from store.models import (
+    ArchivedOrder,
+    Category,
+    Item,
+    ItemVariant,
+    Order,
+    OrderStatus,
+    Purchase,
+)
+from store.orders import archive_orders, transition_orders
+from store.views import OrderExportViewSet, OrderStatusViewSet, OrderViewSet
 
 
 class OrderTest(TestCase):
@@ -95,3 +113,245 @@ class OrderTest(TestCase):
         force_authenticate(request, self.customer1)
         response = view(request, pk=self.order.pk)
         self.assertNotEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_get_order_list_queries(self):
+        view = OrderViewSet.as_view({"get": "list"})
+        category = Category.objects.create(name="category")
+        for i in range(5):
+            item = Item.objects.create(
+                user=self.merchant, name=f"item {i}", description="description"
+            )
+            item.categories.add(category)
+            order = Order.objects.create(user=self.customer, timestamp=timezone.now())
+            for color in ("Black", "White"):
+                Purchase.objects.create(
+                    order=order,
+                    item_variant=ItemVariant.objects.create(
+                        item=item, stock=2, rate=2, color=color
+                    ),
+                    quantity=1,
+                )
+
+        request = APIRequestFactory().get("/order/")
+        force_authenticate(request, self.customer)
+        # Count, orders, purchases with variants, items with their owners,
+        # variants, images and categories, however many orders there are
+        with self.assertNumQueries(7):
+            response = view(request)
+        self.assertEqual(response.data["count"], 6)
+
+    def test_get_order_list_compact(self):
+        view = OrderViewSet.as_view({"get": "list"})
+        for _ in range(3):
+            order = Order.objects.create(user=self.customer, timestamp=timezone.now())
+            Purchase.objects.create(
+                order=order, item_variant=self.item_variant, quantity=2
+            )
+
+        request = APIRequestFactory().get("/order/", {"compact": "1"})
+        force_authenticate(request, self.customer)
+        # Count, orders and purchases joined with their variants and items
+        with self.assertNumQueries(3):
+            response = view(request)
+        self.assertEqual(response.data["count"], 4)
+        self.assertEqual(
+            response.data["results"][0]["purchases"],
+            [
+                {
+                    "item": self.item.pk,
+                    "item_variant": self.item_variant.pk,
+                    "name": "item",
+                    "color": "Black",
+                    "quantity": 2,
+                    "unit_rate": 2,
+                }
+            ],
+        )
+
+    def test_update_totals(self):
+        self.assertEqual(self.purchase.unit_rate, self.item_variant.rate)
+        other_variant = ItemVariant.objects.create(
+            item=self.item, stock=2, rate=5, color="White"
+        )
+        Purchase.objects.create(
+            order=self.order, item_variant=other_variant, quantity=3, unit_rate=4
+        )
+        self.order.update_totals()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_quantity, 4)
+        self.assertEqual(self.order.total_amount, 2 + 3 * 4)
+        self.assertEqual(self.order.total_items(), 4)
+
+    def test_export(self):
+        view = OrderExportViewSet.as_view({"get": "list"})
+        self.user.is_staff = True
+        self.user.save()
+        old = Order.objects.create(
+            user=self.customer, timestamp=timezone.now() - timedelta(days=10)
+        )
+        Purchase.objects.create(order=old, item_variant=self.item_variant, quantity=1)
+        today = timezone.localdate()
+        params = {"start": str(today - timedelta(days=1)), "end": str(today)}
+
+        def export(user, **extra):
+            request = APIRequestFactory().get("/order_export/", {**params, **extra})
+            force_authenticate(request, user)
+            return view(request)
+
+        self.assertEqual(export(self.customer).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(
+            export(self.user, end="2000-01-01").status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+        response = export(self.user)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(
+            csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode()))
+        )
+        self.assertEqual(
+            {int(row["order"]) for row in rows}, {self.order.pk, self.order1.pk}
+        )
+        self.assertEqual(rows[0]["item_name"], "item")
+        self.assertEqual(rows[0]["unit_rate"], "2")
+
+        response = export(self.user, output="ndjson")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]["user"], self.order.user.email)
+
+        # Archived orders are exported, in order, with the others
+        old.status = OrderStatus.Delivered
+        old.save()
+        self.assertEqual(archive_orders(timezone.now() - timedelta(days=5)), 1)
+        newer = Order.objects.create(
+            user=self.customer1, timestamp=timezone.now() - timedelta(days=20)
+        )
+        Purchase.objects.create(order=newer, item_variant=self.item_variant, quantity=2)
+        response = export(self.user, start=str(today - timedelta(days=30)))
+        rows = list(
+            csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode()))
+        )
+        self.assertEqual(
+            [int(row["order"]) for row in rows],
+            [newer.pk, old.pk, self.order.pk, self.order1.pk],
+        )
+        self.assertEqual(rows[1]["status"], str(OrderStatus.Delivered.value))
+
+    def test_order_status(self):
+        view = OrderStatusViewSet.as_view({"post": "create"})
+        self.user.is_staff = True
+        self.user.save()
+        self.order1.status = OrderStatus.Cancelled
+        self.order1.save()
+        pending = [
+            Order.objects.create(user=self.customer, timestamp=timezone.now()).pk
+            for _ in range(3)
+        ]
+        data = {
+            "orders": [self.order.pk, self.order1.pk, *pending],
+            "status": OrderStatus.Delivered,
+        }
+
+        request = APIRequestFactory().post("/order_status/", data, format="json")
+        force_authenticate(request, self.customer)
+        self.assertEqual(view(request).status_code, status.HTTP_403_FORBIDDEN)
+
+        OutboxMessage.objects.all().delete()
+        OrderNotification.objects.all().delete()
+        request = APIRequestFactory().post("/order_status/", data, format="json")
+        force_authenticate(request, self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = view(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            {"updated": [self.order.pk, *pending], "rejected": [self.order1.pk]},
+        )
+        self.assertEqual(Order.objects.filter(status=OrderStatus.Delivered).count(), 4)
+        # Delivered orders can't be cancelled
+        self.assertEqual(
+            transition_orders([self.order.pk], OrderStatus.Cancelled),
+            ([], [self.order.pk]),
+        )
+        # One digest for the customer's orders
+        with self.settings(ORDER_NOTIFICATION_WINDOW=0):
+            self.assertEqual(send_order_digests(), 1)
+        deliver_outbox()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.customer.email])
+        for order in [self.order.pk, *pending]:
+            self.assertIn(f"#{order}", mail.outbox[0].alternatives[0][0])
+
+    def test_status_changed(self):
+        # Placing an order isn't a status change
+        self.assertFalse(OrderNotification.objects.exists())
+
+        order = Order.objects.get(pk=self.order.pk)
+        self.assertFalse(order.status_changed())
+        order.save()
+        order.update_totals()
+        self.assertFalse(OrderNotification.objects.exists())
+
+        order.status = OrderStatus.Delivered
+        self.assertTrue(order.status_changed())
+        order.save()
+        self.assertFalse(order.status_changed())
+        order.save()
+        self.assertEqual(OrderNotification.objects.get().order, order)
+
+    def test_archive_orders(self):
+        old = timezone.now() - timedelta(days=400)
+        self.order.status = OrderStatus.Delivered
+        self.order.timestamp = old
+        self.order.save()
+        self.order.update_totals()
+        # Pending orders and recent ones stay
+        self.order1.timestamp = old
+        self.order1.save()
+        recent = Order.objects.create(
+            user=self.customer, timestamp=timezone.now(), status=OrderStatus.Cancelled
+        )
+        cancelled = [
+            Order.objects.create(
+                user=self.customer, timestamp=old, status=OrderStatus.Cancelled
+            ).pk
+            for _ in range(2)
+        ]
+
+        archived = archive_orders(timezone.now() - timedelta(days=365), batch_size=2)
+        self.assertEqual(archived, 3)
+        self.assertEqual(
+            set(Order.objects.values_list("pk", flat=True)),
+            {self.order1.pk, recent.pk},
+        )
+        self.assertEqual(
+            set(ArchivedOrder.objects.values_list("pk", flat=True)),
+            {self.order.pk, *cancelled},
+        )
+        self.assertFalse(Purchase.objects.filter(order=self.order.pk).exists())
+
+        # Archived orders are still served, to their owner only
+        view = OrderViewSet.as_view({"get": "retrieve"})
+        request = APIRequestFactory().get("/order/")
+        force_authenticate(request, self.customer)
+        response = view(request, pk=self.order.pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], "Delivered")
+        self.assertEqual(response.data["total_quantity"], 1)
+        self.assertEqual(len(response.data["purchases"]), 1)
+        self.assertEqual(response.data["purchases"][0]["unit_rate"], 2)
+
+        force_authenticate(request, self.customer1)
+        response = view(request, pk=self.order.pk)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        # Listings only cover the hot table
+        view = OrderViewSet.as_view({"get": "list"})
+        force_authenticate(request, self.customer)
+        self.assertEqual(view(request).data["count"], 1)
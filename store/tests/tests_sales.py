@@ -0,0 +1,162 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from store.models import (
+    Item,
+    ItemVariant,
+    MerchantProfile,
+    Order,
+    OrderStatus,
+    Purchase,
+)
+from store.orders import archive_orders
+from store.views import SalesViewSet
+
+
+class SalesTest(TestCase):
+    def setUp(self):
+        self.merchant = get_user_model().objects.create(email="merchant@example.com")
+        MerchantProfile.objects.create(
+            user=self.merchant,
+            first_name="Merchant",
+            last_name="Merchant",
+            contact="+9779840424011",
+            reason_for_signup="reason",
+            address="location",
+        )
+        other_merchant = get_user_model().objects.create(email="other@example.com")
+        self.customer = get_user_model().objects.create(email="customer@example.com")
+
+        self.item_variant = ItemVariant.objects.create(
+            item=Item.objects.create(
+                user=self.merchant, name="item", description="description"
+            ),
+            rate=10,
+            stock=100,
+            color="Black",
+        )
+        other_variant = ItemVariant.objects.create(
+            item=Item.objects.create(
+                user=other_merchant, name="other", description="description"
+            ),
+            rate=10,
+            stock=100,
+            color="Black",
+        )
+
+        now = timezone.now()
+        self.purchases = []
+        for days, quantity, order_status in (
+            (2, 1, OrderStatus.Delivered),
+            (1, 2, OrderStatus.Pending),
+            (1, 3, OrderStatus.Cancelled),
+            (0, 4, OrderStatus.Pending),
+        ):
+            order = Order.objects.create(
+                user=self.customer,
+                timestamp=now - timedelta(days=days),
+                status=order_status,
+            )
+            self.purchases.append(
+                Purchase.objects.create(
+                    order=order, item_variant=self.item_variant, quantity=quantity
+                )
+            )
+            Purchase.objects.create(order=order, item_variant=other_variant, quantity=5)
+
+    def test_list(self):
+        view = SalesViewSet.as_view({"get": "list"})
+        factory = APIRequestFactory()
+
+        request = factory.get("/sales/")
+        force_authenticate(request, self.customer)
+        self.assertEqual(view(request).status_code, status.HTTP_403_FORBIDDEN)
+
+        request = factory.get("/sales/")
+        force_authenticate(request, self.merchant)
+        # One query for the hot table, one for the archive
+        with self.assertNumQueries(2):
+            response = view(request)
+        self.assertEqual(
+            [sale["quantity"] for sale in response.data["results"]], [4, 3, 2, 1]
+        )
+        sale = response.data["results"][0]
+        self.assertEqual(sale["order"], self.purchases[-1].order_id)
+        self.assertEqual(sale["status"], "Pending")
+        self.assertEqual(sale["unit_rate"], 10)
+
+    def test_pages(self):
+        view = SalesViewSet.as_view({"get": "list"})
+        SalesViewSet.pagination_class.page_size = 3
+        self.addCleanup(setattr, SalesViewSet.pagination_class, "page_size", 50)
+
+        request = APIRequestFactory().get("/sales/")
+        force_authenticate(request, self.merchant)
+        response = view(request)
+        self.assertEqual(len(response.data["results"]), 3)
+
+        request = APIRequestFactory().get(response.data["next"])
+        force_authenticate(request, self.merchant)
+        response = view(request)
+        self.assertEqual([sale["quantity"] for sale in response.data["results"]], [1])
+        self.assertIsNone(response.data["next"])
+
+    def test_revenue(self):
+        view = SalesViewSet.as_view({"get": "revenue"})
+        today = timezone.localdate()
+
+        request = APIRequestFactory().get(
+            "/sales/revenue/",
+            {"start": str(today - timedelta(days=1)), "end": str(today)},
+        )
+        force_authenticate(request, self.merchant)
+        response = view(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Cancelled orders and older days are left out
+        self.assertEqual(
+            [(day["quantity"], day["revenue"]) for day in response.data],
+            [(2, 20), (4, 40)],
+        )
+
+        request = APIRequestFactory().get("/sales/revenue/", {"start": str(today)})
+        force_authenticate(request, self.merchant)
+        self.assertEqual(view(request).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_archived_sales(self):
+        # The delivered and cancelled orders of the previous days
+        self.assertEqual(archive_orders(timezone.now() - timedelta(hours=12)), 2)
+        self.assertEqual(
+            Purchase.objects.filter(item_variant=self.item_variant).count(), 2
+        )
+
+        view = SalesViewSet.as_view({"get": "list"})
+        SalesViewSet.pagination_class.page_size = 2
+        self.addCleanup(setattr, SalesViewSet.pagination_class, "page_size", 50)
+        request = APIRequestFactory().get("/sales/")
+        force_authenticate(request, self.merchant)
+        response = view(request)
+        quantities = [sale["quantity"] for sale in response.data["results"]]
+        request = APIRequestFactory().get(response.data["next"])
+        force_authenticate(request, self.merchant)
+        response = view(request)
+        quantities += [sale["quantity"] for sale in response.data["results"]]
+        self.assertEqual(quantities, [4, 3, 2, 1])
+        self.assertEqual(response.data["results"][-1]["status"], "Delivered")
+        self.assertIsNone(response.data["next"])
+
+        view = SalesViewSet.as_view({"get": "revenue"})
+        today = timezone.localdate()
+        request = APIRequestFactory().get(
+            "/sales/revenue/",
+            {"start": str(today - timedelta(days=2)), "end": str(today)},
+        )
+        force_authenticate(request, self.merchant)
+        self.assertEqual(
+            [(day["quantity"], day["revenue"]) for day in view(request).data],
+            [(1, 10), (2, 20), (4, 40)],
+        )
@@ -3,7 +3,7 @@ from django.test import TestCase
 from rest_framework.test import APIRequestFactory, force_authenticate
 from rest_framework import status
 
-from store.models import Item, ItemVariant, WishlistItem
+from store.models import Cart, CartItem, Item, ItemVariant, Wishlist, WishlistItem
 from store.views import WishlistViewSet
 
 
@@ -37,6 +37,28 @@ class WishlistTest(TestCase):
         response = view(request)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_get_wishlist_list_queries(self):
+        view = WishlistViewSet.as_view({"get": "list"})
+        wishlist = Wishlist.objects.for_user(self.customer)
+        for i in range(5):
+            item = Item.objects.create(
+                user=self.merchant, name=f"item {i}", description="description"
+            )
+            WishlistItem.objects.create(
+                wishlist=wishlist,
+                item_variant=ItemVariant.objects.create(
+                    item=item, stock=2, rate=2, color="Black"
+                ),
+            )
+
+        request = APIRequestFactory().get("/wishlist/")
+        force_authenticate(request, self.customer)
+        # Wishlist, lines with variants, items with their owners, variants,
+        # images and categories, however long the wishlist is
+        with self.assertNumQueries(6):
+            response = view(request)
+        self.assertEqual(len(response.data["items"]), 5)
+
     def test_put_wishlist(self):
         factory = APIRequestFactory()
         view = WishlistViewSet.put
@@ -67,7 +89,8 @@ class WishlistTest(TestCase):
 
         # Authenticated, but invalid data
         WishlistItem.objects.create(
-            wishlist=self.customer.wishlist, item_variant=self.item_variant
+            wishlist=Wishlist.objects.for_user(self.customer),
+            item_variant=self.item_variant,
         )
         request = factory.put("/wishlist/", data={}, format="json")
         force_authenticate(request, self.customer)
@@ -101,3 +124,58 @@ class WishlistTest(TestCase):
         request = Request(request, parsers=[JSONParser()])
         response = view(request)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_move_to_cart(self):
+        factory = APIRequestFactory()
+        view = WishlistViewSet.as_view({"post": "move_to_cart"})
+        wishlist = Wishlist.objects.for_user(self.customer)
+        cart = Cart.objects.for_user(self.customer)
+        variants = [self.item_variant] + [
+            ItemVariant.objects.create(item=self.item, stock=2, rate=5, color=color)
+            for color in ("White", "Red")
+        ]
+        WishlistItem.objects.bulk_create(
+            WishlistItem(wishlist=wishlist, item_variant=variant)
+            for variant in variants
+        )
+        CartItem.objects.create(cart=cart, item_variant=self.item_variant, quantity=2)
+
+        request = factory.post("/wishlist/move_to_cart/", {}, format="json")
+        self.assertNotEqual(view(request).status_code, status.HTTP_200_OK)
+
+        request = factory.post(
+            "/wishlist/move_to_cart/",
+            {"item_variants": [variants[0].pk, variants[1].pk]},
+            format="json",
+        )
+        force_authenticate(request, self.customer)
+        response = view(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            {
+                "moved": [variants[0].pk, variants[1].pk],
+                "lines": 2,
+                "total_quantity": 4,
+                "total": 11,
+            },
+        )
+        # Quantities are merged into existing lines
+        self.assertEqual(
+            dict(cart.items.values_list("item_variant", "quantity")),
+            {variants[0].pk: 3, variants[1].pk: 1},
+        )
+        self.assertEqual(
+            list(wishlist.items.values_list("item_variant", flat=True)),
+            [variants[2].pk],
+        )
+
+        # The rest of the wishlist
+        request = factory.post(
+            "/wishlist/move_to_cart/", {"quantity": 2}, format="json"
+        )
+        force_authenticate(request, self.customer)
+        response = view(request)
+        self.assertEqual(response.data["moved"], [variants[2].pk])
+        self.assertEqual(cart.items.get(item_variant=variants[2]).quantity, 2)
+        self.assertFalse(wishlist.items.exists())
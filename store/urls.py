@@ -10,6 +10,11 @@ router.register("customer", views.CustomerProfileViewSet, basename="customer")
 router.register("item", views.ItemViewSet, basename="item")
 router.register("category", views.CategoryViewSet, basename="category")
 router.register("order", views.OrderViewSet, basename="order")
+router.register("order_export", views.OrderExportViewSet, basename="order_export")
+router.register("order_status", views.OrderStatusViewSet, basename="order_status")
+router.register("sales", views.SalesViewSet, basename="sales")
 router.register("cart", views.CartViewSet, basename="cart")
+router.register("checkout", views.CheckoutRequestViewSet, basename="checkout")
 router.register("wishlist", views.WishlistViewSet, basename="wishlist")
 router.register("banner", views.BannerImageViewSet, basename="banner")
+router.register("catalog_cache", views.CatalogCacheViewSet, basename="catalog_cache")
@@ -1,4 +1,60 @@
+import heapq
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+
 def get_profile(model, user):
     if model.objects.filter(user=user.pk).exists():
         return model.objects.get(user=user.pk)
     return None
+
+
+def get_query_flag(request, name):
+    value = request.query_params.get(name, "")
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def get_day_bounds(start, end):
+    """Aware datetimes bounding the days from `start` to `end` (inclusive)"""
+    return (
+        timezone.make_aware(datetime.combine(start, time.min)),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)),
+    )
+
+
+class MergedQuerySet:
+    """
+    Read-only union of querysets whose rows have disjoint primary keys (e.g.
+    `Purchase` and `ArchivedPurchase`), merged in Python. Supports what
+    `CursorPagination` needs: `filter`, `order_by` and slicing.
+    """
+
+    def __init__(self, *querysets, ordering=()):
+        self.querysets = querysets
+        self.ordering = ordering
+
+    def filter(self, *args, **kwargs):
+        return MergedQuerySet(
+            *(queryset.filter(*args, **kwargs) for queryset in self.querysets),
+            ordering=self.ordering,
+        )
+
+    def order_by(self, *ordering):
+        if len({field.startswith("-") for field in ordering}) > 1:
+            raise ValueError("Mixed ordering directions can't be merged")
+        return MergedQuerySet(
+            *(queryset.order_by(*ordering) for queryset in self.querysets),
+            ordering=ordering,
+        )
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.stop is None or key.step:
+            raise TypeError("Only bounded slices of merged querysets are supported")
+        fields = [field.lstrip("-") for field in self.ordering]
+        merged = heapq.merge(
+            *(queryset[: key.stop] for queryset in self.querysets),
+            key=lambda obj: tuple(getattr(obj, field) for field in fields),
+            reverse=bool(self.ordering) and self.ordering[0].startswith("-"),
+        )
+        return list(merged)[key]
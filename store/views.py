@@ -1,5 +1,9 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.utils import timezone
+from django.db.models import F, Prefetch, Sum
+from django.db.models.functions import TruncDate
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from django.utils.translation import gettext_lazy as _
 
 from rest_framework import viewsets
@@ -9,18 +13,46 @@ from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework import status
 from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
 from django_filters.rest_framework import DjangoFilterBackend
 
+from core.idempotency import idempotent
 from authentication.signals import new_verification_link
 from authentication import utils
+import store.checkout as store_checkout
 import store.permissions as store_permissions
+from .catalog import (
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    get_cache_stats,
+    reset_cache_stats,
+)
+from .exports import (
+    ORDER_EXPORT_FIELDS,
+    order_export_rows,
+    stream_csv,
+    stream_ndjson,
+)
+from .orders import transition_orders
+from .utils import MergedQuerySet, get_day_bounds, get_query_flag
 from .serializers import (
     CustomerProfileSerializer,
     SignupSerializer,
     ItemSerializer,
+    ItemListSerializer,
     ItemAddSerializer,
     OrderSerializer,
+    OrderCompactSerializer,
+    OrderExportSerializer,
+    OrderTransitionSerializer,
+    DateRangeSerializer,
+    SaleSerializer,
     CartSerializer,
+    CartLineSerializer,
+    CartSummarySerializer,
+    CheckoutRequestSerializer,
+    WishlistMoveSerializer,
     WishlistSerializer,
     BannerImageSerializer,
     CategorySerializer,
@@ -28,11 +60,15 @@ from .serializers import (
 from .models import (
     Item,
     CustomerProfile,
+    ArchivedOrder,
+    ArchivedPurchase,
     Order,
+    OrderStatus,
+    Purchase,
     Cart,
+    CheckoutRequest,
     Wishlist,
     BannerImage,
-    Purchase,
     Category,
     Rating,
 )
@@ -137,6 +173,7 @@ class CustomerProfileViewSet(
             status=status.HTTP_400_BAD_REQUEST,
         )
 
+    @idempotent
     def create(self, request, *args, **kwargs):
         response = super().create(request, *args, **kwargs)
         user = self.get_queryset().filter(email=response.data["email"]).first()
@@ -146,7 +183,12 @@ class CustomerProfileViewSet(
 
 
 class ItemViewSet(
-    mixins.ListModelMixin, mixins.CreateModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    mixins.ListModelMixin,
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet,
 ):
     """
     Endpoint for the Item resource.
@@ -157,6 +199,23 @@ class ItemViewSet(
 
     Use the GET method to list items
 
+    Add `?compact=1` to get a lightweight representation
+    (`id`, `name`, `subtitle`, `min_rate`, `image` and `rating`),
+    suitable for item cards and grids.
+
+    ---
+
+    ## GET /item/?ids=*id*,*id*,...
+
+    GET many items at once (at most 100), in the order of the IDs.
+    The response is not paginated. IDs that don't exist (anymore)
+    are listed in `missing`. Can't be combined with `categories`,
+    `recommend` or `search`.
+
+    ```
+    {"results": [...], "missing": [5]}
+    ```
+
     ---
 
     ## GET /item/*id*/
@@ -180,15 +239,30 @@ class ItemViewSet(
 
     queryset = Item.objects.all()
     serializer_class = ItemSerializer
+    catalogs = ("item",)
     filter_backends = (DjangoFilterBackend, filters.SearchFilter)
     filterset_fields = ("categories", "recommend")
     search_fields = ("name", "description")
+    max_batch_ids = 100
+
+    def is_compact(self):
+        return self.action == "list" and get_query_flag(self.request, "compact")
 
     def get_serializer_class(self):
+        if self.is_compact():
+            return ItemListSerializer
         return {
             "create": ItemAddSerializer,
         }.get(self.action, super().get_serializer_class())
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.is_compact():
+            return queryset.for_listing()
+        if self.action in ("list", "retrieve"):
+            return queryset.with_details()
+        return queryset
+
     def get_permissions(self):
         permissions_classes = {
             "list": [permissions.AllowAny],
@@ -203,6 +277,53 @@ class ItemViewSet(
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def get_batch_ids(self):
+        ids = self.request.query_params.get("ids")
+        if ids is None:
+            return None
+        # Otherwise filtered out items would be reported as missing
+        filtered = [
+            param
+            for param in (*self.filterset_fields, filters.SearchFilter.search_param)
+            if param in self.request.query_params
+        ]
+        if filtered:
+            raise ValidationError(
+                detail={
+                    "detail": _("ids can't be combined with %(params)s")
+                    % {"params": ", ".join(filtered)}
+                }
+            )
+        try:
+            ids = [int(pk) for pk in ids.split(",") if pk.strip()]
+        except ValueError:
+            raise ValidationError(
+                detail={"detail": _("ids must be a comma separated list of integers")}
+            )
+        ids = list(dict.fromkeys(ids))
+        if not ids or len(ids) > self.max_batch_ids:
+            raise ValidationError(
+                detail={
+                    "detail": _("Provide between 1 and %(count)d ids")
+                    % {"count": self.max_batch_ids}
+                }
+            )
+        return ids
+
+    def paginate_queryset(self, queryset):
+        # A batch is returned whole, in the order of the requested ids
+        ids = self.get_batch_ids()
+        if ids is None:
+            return super().paginate_queryset(queryset)
+        items = {item.pk: item for item in queryset.filter(pk__in=ids)}
+        self.missing_ids = [pk for pk in ids if pk not in items]
+        return [items[pk] for pk in ids if pk in items]
+
+    def get_paginated_response(self, data):
+        if self.get_batch_ids() is None:
+            return super().get_paginated_response(data)
+        return Response({"results": data, "missing": self.missing_ids})
+
     @action(detail=True, methods=["get"])
     def get_user_rating(self, request, pk=None):
         item = Item.objects.get(pk=pk)
@@ -215,6 +336,7 @@ class ItemViewSet(
         )
 
     @action(detail=True, methods=["post"])
+    @idempotent
     def rating(self, request, pk=None):
         item = Item.objects.get(pk=pk)
         try:
@@ -277,19 +399,66 @@ class OrderViewSet(
 
     Use the GET method to list orders
 
+    ### Query parameters
+
+    - `compact=1`: describe every purchase by what was bought, instead of
+      nesting the full item
+
+    ### Example purchase (compact)
+
+    ```
+    {
+        "item": 1,
+        "item_variant": 3,
+        "name": "Apple",
+        "color": "Red",
+        "quantity": 2,
+        "unit_rate": 50
+    }
+    ```
+
     ---
 
     ## GET /order/*id*/
 
-    Provide the *id* in the URL to GET order details.
+    Provide the *id* in the URL to GET order details. Archived orders are
+    looked up as well.
 
     ---
     """
 
     serializer_class = OrderSerializer
 
+    def is_compact(self):
+        return self.action == "list" and get_query_flag(self.request, "compact")
+
+    def get_serializer_class(self):
+        if self.is_compact():
+            return OrderCompactSerializer
+        return super().get_serializer_class()
+
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user.pk)
+        if self.is_compact():
+            purchases = Purchase.objects.select_related("item_variant__item")
+        else:
+            purchases = Purchase.objects.with_items()
+        return Order.objects.filter(user=self.request.user.pk).prefetch_related(
+            Prefetch("purchases", queryset=purchases)
+        )
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            # Old orders are moved out of `Order` by `archiveorders`
+            queryset = ArchivedOrder.objects.filter(
+                user=self.request.user.pk
+            ).prefetch_related(
+                Prefetch("purchases", queryset=ArchivedPurchase.objects.with_items())
+            )
+            order = get_object_or_404(queryset, pk=self.kwargs["pk"])
+            self.check_object_permissions(self.request, order)
+            return order
 
     def get_permissions(self):
         permissions_classes = {
@@ -308,13 +477,47 @@ class CartViewSet(viewsets.GenericViewSet):
 
     ## GET /cart/
 
-    GET cart details
+    GET cart details: the items with their `subtotal` and whether they are
+    `in_stock`, and the cart `total`
+
+    ### Query parameters
+
+    - `summary=1`: leave out the nested `item` of every line
+
+    ### Example response (summary)
+
+    ```
+    {
+        "items": [
+            {"item_variant": 1, "quantity": 2, "subtotal": 100, "in_stock": true}
+        ],
+        "total": 100
+    }
+    ```
+
+    ---
+
+    ## POST /cart/checkout
+
+    Checkout cart (`GET` is still accepted, but deprecated)
+
+    During peak traffic checkouts may be queued instead. The response is then
+    `202 - Accepted` with the checkout request, whose `url` tells when the
+    order has been placed (see `/checkout/`).
 
     ---
 
-    ## GET /cart/checkout
+    ## POST /cart/reserve
+
+    Hold the stock of the items in the cart for a few minutes
+    (e.g. while the payment is completed). Reserving again replaces
+    the previous holds, checking out converts them into the order.
 
-    Checkout cart
+    ### Example response
+
+    ```
+    {"expires_at": "2023-03-09T09:26:00Z"}
+    ```
 
     ---
     ## PUT /cart
@@ -337,6 +540,28 @@ class CartViewSet(viewsets.GenericViewSet):
     {"items": [{"item_variant": 1, "quantity": 1}]}
     ```
     ---
+
+    ## PATCH /cart
+
+    Change a single line of the cart. `op` is one of `add`, `remove`
+    or `set_quantity` (setting the quantity to 0 removes the line).
+
+    Responds with the resulting line and the size of the cart.
+
+    ---
+
+    ### Example request
+
+    ```
+    {"op": "add", "item_variant": 1, "quantity": 1}
+    ```
+
+    ### Example response
+
+    ```
+    {"item_variant": 1, "quantity": 3, "lines": 2, "total_quantity": 4, "total": 200}
+    ```
+    ---
     """
 
     serializer_class = CartSerializer
@@ -348,19 +573,27 @@ class CartViewSet(viewsets.GenericViewSet):
             "list": [permissions.IsAuthenticated],
             "retrieve": [store_permissions.IsOwner],
             "checkout": [permissions.IsAuthenticated],
+            "reserve": [permissions.IsAuthenticated],
         }.get(self.action, [permissions.AllowAny])
         return (permission() for permission in permissions_classes)
 
+    def get_serializer_class(self):
+        if self.action == "list" and get_query_flag(self.request, "summary"):
+            return CartSummarySerializer
+        return super().get_serializer_class()
+
     def list(self, request, *args, **kwargs):
         serializer_class = self.get_serializer_class()
-        return Response(
-            serializer_class(request.user.cart, context={"request": request}).data
-        )
+        cart = Cart.objects.with_lines(
+            items=serializer_class is not CartSummarySerializer
+        ).for_user(request.user)
+        return Response(serializer_class(cart, context={"request": request}).data)
 
     @staticmethod
+    @idempotent
     def put(request):
         if request.user and request.user.is_authenticated:
-            instance = request.user.cart
+            instance = Cart.objects.for_user(request.user)
             serializer = CartSerializer(
                 instance=instance,
                 data=request.data,
@@ -369,35 +602,80 @@ class CartViewSet(viewsets.GenericViewSet):
             )
             serializer.is_valid(raise_exception=True)
             serializer.save()
-            return Response(serializer.data)
+            cart = Cart.objects.with_lines().get(pk=instance.pk)
+            return Response(CartSerializer(cart, context={"request": request}).data)
         return Response(status=status.HTTP_401_UNAUTHORIZED)
 
-    @action(detail=False, methods=["get"])
+    @staticmethod
+    def patch(request):
+        if request.user and request.user.is_authenticated:
+            serializer = CartLineSerializer(
+                data=request.data, context={"request": request}
+            )
+            serializer.is_valid(raise_exception=True)
+            return Response(serializer.save(Cart.objects.for_user(request.user)))
+        return Response(status=status.HTTP_401_UNAUTHORIZED)
+
+    @action(detail=False, methods=["get", "post"])
+    @idempotent
     def checkout(self, request):
-        cart = request.user.cart
-        if not cart.items.all():
+        cart = Cart.objects.for_user(request.user)
+        try:
+            if settings.CHECKOUT_ASYNC:
+                checkout_request = store_checkout.enqueue_checkout(cart, request.user)
+            else:
+                store_checkout.checkout(cart, request.user)
+        except store_checkout.CheckoutError as e:
+            return Response({"detail": e.message}, status=status.HTTP_400_BAD_REQUEST)
+
+        if settings.CHECKOUT_ASYNC:
+            data = CheckoutRequestSerializer(
+                checkout_request, context={"request": request}
+            ).data
             return Response(
-                {"detail": _("Cart is empty")}, status=status.HTTP_400_BAD_REQUEST
+                data, status=status.HTTP_202_ACCEPTED, headers={"Location": data["url"]}
             )
+        return Response(CartSerializer(instance=cart).data)
 
-        for item in cart.items.all():
-            if item.quantity > item.item_variant.stock:
-                return Response(
-                    {"detail": _("Some items are out of stock")},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-        order = Order.objects.create(user=request.user, timestamp=timezone.now())
-        for cart_item in cart.items.all():
-            Purchase.objects.create(
-                order=order,
-                quantity=cart_item.quantity,
-                item_variant=cart_item.item_variant,
+    @action(detail=False, methods=["post"])
+    def reserve(self, request):
+        try:
+            expires_at = store_checkout.reserve(
+                Cart.objects.for_user(request.user), request.user
             )
-            cart_item.item_variant.stock -= cart_item.quantity
-            cart_item.item_variant.save()
-        cart.clear()
-        return Response(CartSerializer(instance=cart).data)
+        except store_checkout.CheckoutError as e:
+            return Response({"detail": e.message}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"expires_at": expires_at})
+
+
+class CheckoutRequestViewSet(
+    mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet
+):
+    """
+    Endpoint for queued checkouts (see `/cart/checkout`).
+
+    ---
+
+    ## GET /checkout/
+
+    List your checkout requests
+
+    ---
+
+    ## GET /checkout/*id*/
+
+    GET the status of a checkout request: `Queued`, `Completed`
+    (`order` links to the placed order) or `Failed` (`detail` explains why,
+    the items are put back into the cart).
+
+    ---
+    """
+
+    serializer_class = CheckoutRequestSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_queryset(self):
+        return CheckoutRequest.objects.filter(user=self.request.user.pk)
 
 
 class WishlistViewSet(viewsets.GenericViewSet):
@@ -431,6 +709,29 @@ class WishlistViewSet(viewsets.GenericViewSet):
     {"items": [{"item_variant": 1}]}
     ```
     ---
+
+    ## POST /wishlist/move_to_cart
+
+    Move items from the wishlist into the cart, adding `quantity` (default 1)
+    to lines already in the cart. Leave out `item_variants` to move the
+    whole wishlist.
+
+    Responds with the moved item variants and the size of the cart.
+
+    ---
+
+    ### Example request
+
+    ```
+    {"item_variants": [1, 2], "quantity": 1}
+    ```
+
+    ### Example response
+
+    ```
+    {"moved": [1, 2], "lines": 3, "total_quantity": 4, "total": 250}
+    ```
+    ---
     """
 
     serializer_class = WishlistSerializer
@@ -441,19 +742,20 @@ class WishlistViewSet(viewsets.GenericViewSet):
             "create": [permissions.IsAuthenticated],
             "list": [permissions.IsAuthenticated],
             "retrieve": [store_permissions.IsOwner],
+            "move_to_cart": [permissions.IsAuthenticated],
         }.get(self.action, [permissions.AllowAny])
         return (permission() for permission in permissions_classes)
 
     def list(self, request, *args, **kwargs):
         serializer_class = self.get_serializer_class()
-        return Response(
-            serializer_class(request.user.wishlist, context={"request": request}).data
-        )
+        wishlist = Wishlist.objects.with_lines().for_user(request.user)
+        return Response(serializer_class(wishlist, context={"request": request}).data)
 
     @staticmethod
+    @idempotent
     def put(request):
         if request.user and request.user.is_authenticated:
-            instance = request.user.wishlist
+            instance = Wishlist.objects.for_user(request.user)
             serializer = WishlistSerializer(
                 instance=instance,
                 data=request.data,
@@ -462,12 +764,30 @@ class WishlistViewSet(viewsets.GenericViewSet):
             )
             serializer.is_valid(raise_exception=True)
             serializer.save()
-            return Response(serializer.data)
+            wishlist = Wishlist.objects.with_lines().get(pk=instance.pk)
+            return Response(
+                WishlistSerializer(wishlist, context={"request": request}).data
+            )
         return Response(status=status.HTTP_401_UNAUTHORIZED)
 
+    @action(detail=False, methods=["post"])
+    def move_to_cart(self, request):
+        serializer = WishlistMoveSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(
+            serializer.save(
+                Wishlist.objects.for_user(request.user),
+                Cart.objects.for_user(request.user),
+            )
+        )
+
 
 class CategoryViewSet(
-    mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet,
 ):
     """
     Endpoint for the Category resource.
@@ -489,12 +809,17 @@ class CategoryViewSet(
 
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    catalogs = ("category",)
     filter_backends = (DjangoFilterBackend,)
     filterset_fields = ("recommend",)
 
 
 class BannerImageViewSet(
-    mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet,
 ):
     """
     Endpoint for the Banner Image resource.
@@ -516,5 +841,194 @@ class BannerImageViewSet(
 
     queryset = BannerImage.objects.all()
     serializer_class = BannerImageSerializer
+    catalogs = ("banner",)
     filter_backends = (DjangoFilterBackend,)
     filterset_fields = ("for_mobile",)
+
+
+class CatalogCacheViewSet(viewsets.ViewSet):
+    """
+    Endpoint for monitoring the response cache of the catalog endpoints
+    (`item`, `category` and `banner`). **Admins only.**
+
+    ---
+
+    ## GET /catalog_cache/
+
+    GET hit/miss counters of the cache
+
+    ---
+
+    ## DELETE /catalog_cache/
+
+    Reset the counters
+
+    ---
+    """
+
+    permission_classes = (permissions.IsAdminUser,)
+
+    def list(self, request):
+        return Response(get_cache_stats())
+
+    def delete(self, request):
+        reset_cache_stats()
+        return Response(get_cache_stats())
+
+
+class OrderExportViewSet(viewsets.ViewSet):
+    """
+    Endpoint for exporting orders, one row per purchase. **Admins only.**
+
+    The export is streamed, so it can cover any range of dates.
+
+    ---
+
+    ## GET /order_export/?start=*date*&end=*date*
+
+    GET the purchases of the orders placed from `start` to `end` (inclusive,
+    `YYYY-MM-DD`). `output` is `csv` (default) or `ndjson`.
+
+    Columns: `order`, `timestamp`, `user`, `status` (0: Pending,
+    1: Delivered, 2: Cancelled), `order_total_quantity`, `order_total_amount`,
+    `item`, `item_name`, `item_variant`, `color`, `quantity`, `unit_rate`
+
+    ---
+    """
+
+    permission_classes = (permissions.IsAdminUser,)
+    content_types = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+    def list(self, request):
+        serializer = OrderExportSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        rows = order_export_rows(params["start"], params["end"])
+        stream = {"csv": stream_csv, "ndjson": stream_ndjson}[params["output"]]
+        response = StreamingHttpResponse(
+            stream(list(ORDER_EXPORT_FIELDS), rows),
+            content_type=self.content_types[params["output"]],
+        )
+        filename = f"orders_{params['start']}_{params['end']}.{params['output']}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
+class OrderStatusViewSet(viewsets.ViewSet):
+    """
+    Endpoint for changing the status of many orders at once. **Staff only.**
+
+    ---
+
+    ## POST /order_status/
+
+    Move `orders` to `status` (0: Pending, 1: Delivered, 2: Cancelled).
+    Only pending orders can be delivered or cancelled; the other orders
+    are `rejected`. The customers are notified in a single batch.
+
+    ---
+
+    ### Example request
+
+    ```
+    {"orders": [1, 2, 3], "status": 1}
+    ```
+
+    ### Example response
+
+    ```
+    {"updated": [1, 3], "rejected": [2]}
+    ```
+    ---
+    """
+
+    permission_classes = (permissions.IsAdminUser,)
+
+    def create(self, request):
+        serializer = OrderTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        updated, rejected = transition_orders(**serializer.validated_data)
+        return Response({"updated": updated, "rejected": rejected})
+
+
+class SalesPagination(CursorPagination):
+    # Keyset pagination on the primary key: the cost of a page doesn't
+    # depend on how deep it is
+    ordering = "-id"
+    page_size = 50
+
+
+class SalesViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Endpoint for the sales of your items. **Merchants only.**
+
+    ---
+
+    ## GET /sales/
+
+    List the purchases of your items (archived orders included), newest
+    first. Follow `next` for the next page.
+
+    ---
+
+    ## GET /sales/revenue/?start=*date*&end=*date*
+
+    GET the quantity sold and the revenue of your items for every day from
+    `start` to `end` (inclusive, `YYYY-MM-DD`) with sales, archived orders
+    included. Cancelled orders are left out.
+
+    ### Example response
+
+    ```
+    [{"date": "2023-03-09", "quantity": 12, "revenue": 1450}]
+    ```
+
+    ---
+    """
+
+    serializer_class = SaleSerializer
+    pagination_class = SalesPagination
+    permission_classes = (store_permissions.IsMerchant,)
+    filter_backends = ()
+
+    def get_queryset(self):
+        # Archived purchases keep their ids, so both tables page together
+        return MergedQuerySet(
+            *(
+                model.objects.filter(
+                    item_variant__item__user=self.request.user.pk
+                ).select_related("order", "item_variant__item")
+                for model in (Purchase, ArchivedPurchase)
+            )
+        )
+
+    @action(detail=False)
+    def revenue(self, request):
+        serializer = DateRangeSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        start, end = get_day_bounds(**serializer.validated_data)
+        days = {}
+        for model in (Purchase, ArchivedPurchase):
+            for day in (
+                model.objects.filter(
+                    item_variant__item__user=request.user.pk,
+                    order__timestamp__gte=start,
+                    order__timestamp__lt=end,
+                )
+                .exclude(order__status=OrderStatus.Cancelled)
+                .annotate(date=TruncDate("order__timestamp"))
+                .values("date")
+                # `revenue` first, `quantity` refers to the sum once it's annotated
+                .annotate(
+                    revenue=Sum(F("quantity") * F("unit_rate")),
+                    quantity=Sum("quantity"),
+                )
+                .order_by()
+            ):
+                total = days.setdefault(
+                    day["date"], {"date": day["date"], "quantity": 0, "revenue": 0}
+                )
+                total["quantity"] += day["quantity"]
+                total["revenue"] += day["revenue"]
+        return Response(sorted(days.values(), key=lambda day: day["date"]))